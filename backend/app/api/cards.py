@@ -5,16 +5,18 @@ POST /api/cards/inject - Inject V3 card into PNG
 POST /api/cards/validate - Validate V3 card JSON
 """
 
-import json
 from typing import Literal
 
-from fastapi import APIRouter, File, Form, HTTPException, Request, UploadFile
+from fastapi import APIRouter, File, Form, HTTPException, Query, Request, UploadFile
 from fastapi.responses import Response
+from pydantic import TypeAdapter
 from pydantic import ValidationError as PydanticValidationError
+from starlette.concurrency import run_in_threadpool
 
 from ..core import (
     ApiResponse,
     CardExportError,
+    CardExportVerificationError,
     CardImportError,
     CharacterCardV3,
     ErrorCode,
@@ -24,16 +26,31 @@ from ..core import (
     export_to_png,
     generate_export_filename,
     import_card,
-    verify_export,
 )
 from ..settings import get_settings
 
 router = APIRouter(prefix="/cards", tags=["cards"])
 
+# Built once at import; validate_json parses the raw string inside pydantic-core
+# without an intermediate Python dict.
+_CARD_ADAPTER = TypeAdapter(CharacterCardV3)
+
+_UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def _format_indexes(indexes: list[int], limit: int = 10) -> str:
+    """Format entry indexes for a warning, truncating long lists."""
+    shown = ", ".join(str(i) for i in indexes[:limit])
+    return f"{shown}, ..." if len(indexes) > limit else shown
+
 
 async def _check_file_size(file: UploadFile, request: Request) -> bytes:
     """Read and validate file size.
 
+    Files whose spooled size is already over the limit are rejected without
+    being read. Otherwise the upload is read in fixed-size chunks so an
+    oversized file is still rejected as soon as the limit is crossed.
+
     Args:
         file: Uploaded file
         request: FastAPI request object
@@ -46,19 +63,28 @@ async def _check_file_size(file: UploadFile, request: Request) -> bytes:
     """
     settings = get_settings()
     max_size = settings.max_upload_bytes
+    too_large = HTTPException(
+        status_code=413,
+        detail={
+            "error": f"File too large. Maximum size is {settings.max_upload_mb}MB",
+            "error_code": ErrorCode.FILE_TOO_LARGE,
+        },
+    )
 
-    content = await file.read()
+    # Size is known once the multipart part is spooled; reject before reading
+    if file.size is not None and file.size > max_size:
+        raise too_large
 
-    if len(content) > max_size:
-        raise HTTPException(
-            status_code=413,
-            detail={
-                "error": f"File too large. Maximum size is {settings.max_upload_mb}MB",
-                "error_code": ErrorCode.FILE_TOO_LARGE,
-            },
-        )
+    chunks: list[bytes] = []
+    total = 0
+
+    while chunk := await file.read(_UPLOAD_CHUNK_SIZE):
+        total += len(chunk)
+        if total > max_size:
+            raise too_large
+        chunks.append(chunk)
 
-    return content
+    return b"".join(chunks)
 
 
 @router.post(
@@ -81,7 +107,7 @@ async def parse_card(
     content = await _check_file_size(file, request)
 
     try:
-        card, source_format, has_image = import_card(content)
+        card, source_format, has_image = await run_in_threadpool(import_card, content)
     except CardImportError as e:
         raise HTTPException(
             status_code=400,
@@ -99,14 +125,14 @@ async def parse_card(
     if token_breakdown.get("total", 0) > 8000:
         warnings.append(f"Card has {token_breakdown['total']} estimated tokens, which may exceed context limits")
 
-    result = ParseResult(
+    result = ParseResult.model_construct(
         card=card,
-        source_format=source_format,  # type: ignore
+        source_format=source_format,
         has_image=has_image,
         warnings=warnings,
     )
 
-    return ApiResponse(success=True, data=result)
+    return ApiResponse[ParseResult].ok(result)
 
 
 @router.post(
@@ -125,23 +151,23 @@ async def inject_card(
     file: UploadFile = File(..., description="Base PNG image"),
     card_v3_json: str = Form(..., description="V3 card JSON string"),
     include_v2_compat: bool = Form(True, description="Include V2-compatible chara chunk"),
-    verify: bool = Form(True, description="Verify export by re-importing"),
+    verify: bool = Form(True, description="Verify the written ccv3 chunk matches the card"),
 ) -> Response:
     """Inject card data into PNG and return the modified image."""
     content = await _check_file_size(file, request)
 
     try:
-        card_data = json.loads(card_v3_json)
-        card = CharacterCardV3.model_validate(card_data)
-    except json.JSONDecodeError as e:
-        raise HTTPException(
-            status_code=400,
-            detail={
-                "error": f"Invalid JSON: {e}",
-                "error_code": ErrorCode.VALIDATION_ERROR,
-            },
-        )
+        card = _CARD_ADAPTER.validate_json(card_v3_json)
     except PydanticValidationError as e:
+        json_errors = [err for err in e.errors() if err["type"] == "json_invalid"]
+        if json_errors:
+            raise HTTPException(
+                status_code=400,
+                detail={
+                    "error": json_errors[0]["msg"],
+                    "error_code": ErrorCode.VALIDATION_ERROR,
+                },
+            )
         raise HTTPException(
             status_code=422,
             detail={
@@ -151,10 +177,20 @@ async def inject_card(
         )
 
     try:
-        result_png = export_to_png(
+        result_png = await run_in_threadpool(
+            export_to_png,
             content,
             card,
             include_v2_compat=include_v2_compat,
+            verify=verify,
+        )
+    except CardExportVerificationError as e:
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "error": str(e),
+                "error_code": ErrorCode.INTERNAL_ERROR,
+            },
         )
     except CardExportError as e:
         raise HTTPException(
@@ -165,17 +201,6 @@ async def inject_card(
             },
         )
 
-    if verify:
-        ok, error_msg = verify_export(result_png, card)
-        if not ok:
-            raise HTTPException(
-                status_code=500,
-                detail={
-                    "error": f"Export verification failed: {error_msg}",
-                    "error_code": ErrorCode.INTERNAL_ERROR,
-                },
-            )
-
     filename = generate_export_filename(card)
 
     return Response(
@@ -195,10 +220,16 @@ async def inject_card(
 )
 async def validate_card(
     card: CharacterCardV3,
+    quick: bool = Query(
+        False,
+        description="Stop after the cheap checks if they already produced errors",
+    ),
 ) -> ApiResponse[ValidateResult]:
     """Validate V3 card structure.
 
     Returns validation result with any errors or warnings.
+    With ``quick=true``, a card that already failed the cheap checks skips
+    token estimation and lorebook checks (useful for batch validation).
     """
     errors = []
     warnings = []
@@ -212,6 +243,11 @@ async def validate_card(
     if not card.data.description:
         warnings.append("Card has no description")
 
+    if quick and errors:
+        return ApiResponse[ValidateResult].ok(
+            ValidateResult.model_construct(valid=False, errors=errors, warnings=warnings)
+        )
+
     token_breakdown = estimate_card_tokens(card)
     total_tokens = token_breakdown.get("total", 0)
     if total_tokens > 12000:
@@ -220,17 +256,24 @@ async def validate_card(
         warnings.append(f"Card has {total_tokens} estimated tokens, which may exceed context limits")
 
     if card.data.character_book:
-        book = card.data.character_book
-        for i, entry in enumerate(book.entries):
-            if not entry.constant and not entry.keys:
-                warnings.append(f"Lorebook entry {i} has no keys and is not constant")
-            if not entry.content:
-                warnings.append(f"Lorebook entry {i} has empty content")
-
-    result = ValidateResult(
+        entries = card.data.character_book.entries
+        no_keys = [i for i, e in enumerate(entries) if not e.constant and not e.keys]
+        if no_keys:
+            warnings.append(
+                f"{len(no_keys)} lorebook entries have no keys and are not constant "
+                f"(indexes: {_format_indexes(no_keys)})"
+            )
+        no_content = [i for i, e in enumerate(entries) if not e.content]
+        if no_content:
+            warnings.append(
+                f"{len(no_content)} lorebook entries have empty content "
+                f"(indexes: {_format_indexes(no_content)})"
+            )
+
+    result = ValidateResult.model_construct(
         valid=len(errors) == 0,
         errors=errors,
         warnings=warnings,
     )
 
-    return ApiResponse(success=True, data=result)
+    return ApiResponse[ValidateResult].ok(result)
@@ -56,12 +56,12 @@ async def export_lorebook(
     if book is None:
         book = Lorebook()
 
-    result = LorebookExportResult(
+    result = LorebookExportResult.model_construct(
         lorebook=book,
         entry_count=len(book.entries),
     )
 
-    return ApiResponse(success=True, data=result)
+    return ApiResponse[LorebookExportResult].ok(result)
 
 
 @router.post(
@@ -107,24 +107,23 @@ async def import_lorebook(
             card.data.character_book = new_lorebook
             entries_added = len(new_lorebook.entries)
         else:
-            existing_ids = set()
-            for entry in existing_book.entries:
-                if entry.id is not None:
-                    existing_ids.add(entry.id)
-
-            for entry in new_lorebook.entries:
-                if entry.id is None or entry.id not in existing_ids:
-                    existing_book.entries.append(entry)
-                    entries_added += 1
+            existing_ids = {e.id for e in existing_book.entries if e.id is not None}
+            to_add = [
+                e
+                for e in new_lorebook.entries
+                if e.id is None or e.id not in existing_ids
+            ]
+            existing_book.entries.extend(to_add)
+            entries_added = len(to_add)
 
     elif merge_mode == "skip":
         if existing_book is None or len(existing_book.entries) == 0:
             card.data.character_book = new_lorebook
             entries_added = len(new_lorebook.entries)
 
-    result = LorebookImportResult(
+    result = LorebookImportResult.model_construct(
         card=card,
         entries_added=entries_added,
     )
 
-    return ApiResponse(success=True, data=result)
+    return ApiResponse[LorebookImportResult].ok(result)
@@ -4,16 +4,21 @@ AI 代理 API 路由
 提供 AI 服务代理功能，支持聊天、模型列表、图像生成。
 """
 
-import json
+import asyncio
+import hashlib
 import logging
-from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
 
+import orjson
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field
+from starlette.types import Receive, Scope, Send
 
 from app.core.ai_client import (
     AIClient,
+    ChatChoice,
     ChatRequest,
     ImageRequest,
     Message,
@@ -27,6 +32,7 @@ from app.core.security import (
     URLBlockedError,
     PrivateIPError,
     redact_sensitive_data,
+    validate_url_security,
 )
 from app.settings import get_settings
 
@@ -34,6 +40,17 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/proxy", tags=["AI Proxy"])
 
+# SSE 帧的固定部分预先编码为 bytes，逐 token 只需拼接 orjson 输出
+_DATA_PREFIX = b"data: "
+_SSE_SUFFIX = b"\n\n"
+_DONE_FRAME = b"data: [DONE]\n\n"
+_ERR_PREFIX = b"event: error\ndata: "
+_INTERNAL_ERR_FRAME = (
+    _ERR_PREFIX
+    + orjson.dumps({"code": "INTERNAL_ERROR", "message": "An unexpected error occurred"})
+    + _SSE_SUFFIX
+)
+
 
 class MessageModel(BaseModel):
     """聊天消息模型"""
@@ -109,6 +126,93 @@ class SSEError(BaseModel):
     message: str = Field(..., description="错误信息")
 
 
+# 按 (base_url, api_key 摘要) 复用 AIClient，保留其 httpx 连接池
+_CLIENT_CACHE_MAXSIZE = 128
+_client_cache: "OrderedDict[Tuple[str, bytes], AIClient]" = OrderedDict()
+
+# 请求处理中的客户端 -> 租用计数；被淘汰时仍在使用的客户端待计数归零后再关闭
+_client_leases: Dict[AIClient, int] = {}
+_evicted_clients: Set[AIClient] = set()
+
+# 后台关闭任务的强引用，防止任务在完成前被垃圾回收
+_close_tasks: "Set[asyncio.Task[None]]" = set()
+
+
+def _schedule_close(client: AIClient) -> None:
+    """在后台关闭客户端。"""
+    task = asyncio.get_running_loop().create_task(client.aclose())
+    _close_tasks.add(task)
+    task.add_done_callback(_close_tasks.discard)
+
+
+def _get_client(base_url: str, api_key: str) -> AIClient:
+    """获取（或创建并缓存）AI 客户端。
+
+    api_key 仅以 blake2b 摘要形式作为缓存键。URL 安全校验每次调用都会执行
+    (DNS 解析结果可能变化)，校验失败的客户端不会被缓存。
+    """
+    key = (base_url, hashlib.blake2b(api_key.encode(), digest_size=16).digest())
+    client = _client_cache.get(key)
+    if client is not None:
+        # 新建客户端时由 AIClient.__init__ 校验，命中缓存时在此重新校验
+        validate_url_security(client.base_url)
+        _client_cache.move_to_end(key)
+        return client
+
+    client = AIClient(base_url=base_url, api_key=api_key)
+    _client_cache[key] = client
+    if len(_client_cache) > _CLIENT_CACHE_MAXSIZE:
+        _, evicted = _client_cache.popitem(last=False)
+        if evicted in _client_leases:
+            _evicted_clients.add(evicted)
+        else:
+            _schedule_close(evicted)
+    return client
+
+
+def _acquire_client(base_url: str, api_key: str) -> AIClient:
+    """获取客户端并登记租用，用完后必须调用 _release_client。"""
+    client = _get_client(base_url, api_key)
+    _client_leases[client] = _client_leases.get(client, 0) + 1
+    return client
+
+
+async def _release_client(client: AIClient) -> None:
+    """归还租用；已被淘汰的客户端在最后一个租用归还时关闭。"""
+    remaining = _client_leases.pop(client, 1) - 1
+    if remaining > 0:
+        _client_leases[client] = remaining
+    elif client in _evicted_clients:
+        _evicted_clients.discard(client)
+        await client.aclose()
+
+
+class _LeasedStreamingResponse(StreamingResponse):
+    """响应结束后归还 client 的租用（包括客户端中途断开、生成器未被迭代的情况）。"""
+    
+    def __init__(self, client: AIClient, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._leased_client = client
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await _release_client(self._leased_client)
+
+
+async def close_clients() -> None:
+    """关闭并清空所有缓存的 AI 客户端。"""
+    clients = [*_client_cache.values(), *_evicted_clients]
+    _client_cache.clear()
+    _evicted_clients.clear()
+    _client_leases.clear()
+    for client in clients:
+        await client.aclose()
+    if _close_tasks:
+        await asyncio.gather(*_close_tasks, return_exceptions=True)
+
+
 def _log_request(endpoint: str, base_url: str) -> None:
     """记录请求日志（脱敏）。"""
     settings = get_settings()
@@ -142,50 +246,54 @@ def _handle_ai_error(e: AIClientError) -> Dict[str, Any]:
     }
 
 
+def _delta_choice(choice: ChatChoice) -> Dict[str, Any]:
+    """流式 choice 转为 OpenAI 兼容 dict（一次构造，finish_reason 仅在存在时输出）。"""
+    if choice.finish_reason:
+        return {
+            "index": choice.index,
+            "delta": choice.delta or {},
+            "finish_reason": choice.finish_reason,
+        }
+    return {"index": choice.index, "delta": choice.delta or {}}
+
+
+def _message_choice(choice: ChatChoice) -> Dict[str, Any]:
+    """非流式 choice 转为 OpenAI 兼容 dict。"""
+    message = choice.message
+    message_dict = (
+        {"role": message.role, "content": message.content}
+        if message
+        else {"role": "assistant", "content": ""}
+    )
+    if choice.finish_reason:
+        return {
+            "index": choice.index,
+            "message": message_dict,
+            "finish_reason": choice.finish_reason,
+        }
+    return {"index": choice.index, "message": message_dict}
+
+
 async def _generate_chat_stream(client: AIClient, request: ChatRequest):
     """生成 SSE 聊天流。"""
     try:
         async for chunk in client.chat_stream(request):
-            choices_data = []
-            for choice in chunk.choices:
-                choice_dict = {
-                    "index": choice.index,
-                    "delta": choice.delta or {},
-                }
-                if choice.finish_reason:
-                    choice_dict["finish_reason"] = choice.finish_reason
-                choices_data.append(choice_dict)
-            
             data = {
                 "id": chunk.id,
                 "object": chunk.object,
                 "created": chunk.created,
                 "model": chunk.model,
-                "choices": choices_data,
+                "choices": [_delta_choice(c) for c in chunk.choices],
             }
-            yield f"data: {json.dumps(data)}\n\n"
+            yield _DATA_PREFIX + orjson.dumps(data) + _SSE_SUFFIX
         
-        yield "data: [DONE]\n\n"
+        yield _DONE_FRAME
         
-    except AIRateLimitedError as e:
-        error_data = _handle_ai_error(e)
-        yield f"event: error\ndata: {json.dumps(error_data)}\n\n"
-    except AITimeoutError as e:
-        error_data = _handle_ai_error(e)
-        yield f"event: error\ndata: {json.dumps(error_data)}\n\n"
-    except NetworkError as e:
-        error_data = _handle_ai_error(e)
-        yield f"event: error\ndata: {json.dumps(error_data)}\n\n"
-    except UpstreamError as e:
-        error_data = _handle_ai_error(e)
-        yield f"event: error\ndata: {json.dumps(error_data)}\n\n"
-    except Exception as e:
+    except AIClientError as e:
+        yield _ERR_PREFIX + orjson.dumps(_handle_ai_error(e)) + _SSE_SUFFIX
+    except Exception:
         logger.exception("Unexpected error in chat stream")
-        error_data = {
-            "code": "INTERNAL_ERROR",
-            "message": "An unexpected error occurred",
-        }
-        yield f"event: error\ndata: {json.dumps(error_data)}\n\n"
+        yield _INTERNAL_ERR_FRAME
 
 
 @router.post("/chat", summary="AI 聊天代理")
@@ -211,10 +319,7 @@ async def proxy_chat(request: ChatRequestModel):
     _log_request("/chat", request.base_url)
     
     try:
-        client = AIClient(
-            base_url=request.base_url,
-            api_key=request.api_key,
-        )
+        client = _acquire_client(request.base_url, request.api_key)
     except (URLBlockedError, PrivateIPError) as e:
         raise _handle_security_error(e)
     
@@ -236,7 +341,8 @@ async def proxy_chat(request: ChatRequestModel):
     )
     
     if request.stream:
-        return StreamingResponse(
+        return _LeasedStreamingResponse(
+            client,
             _generate_chat_stream(client, chat_request),
             media_type="text/event-stream",
             headers={
@@ -249,27 +355,19 @@ async def proxy_chat(request: ChatRequestModel):
         try:
             response = await client.chat(chat_request)
             
-            choices_data = []
-            for choice in response.choices:
-                choice_dict = {
-                    "index": choice.index,
-                    "message": {
-                        "role": choice.message.role if choice.message else "assistant",
-                        "content": choice.message.content if choice.message else "",
-                    },
-                }
-                if choice.finish_reason:
-                    choice_dict["finish_reason"] = choice.finish_reason
-                choices_data.append(choice_dict)
+            choices_data = [_message_choice(c) for c in response.choices]
             
-            return {
-                "id": response.id,
-                "object": response.object,
-                "created": response.created,
-                "model": response.model,
-                "choices": choices_data,
-                "usage": response.usage,
-            }
+            return Response(
+                content=orjson.dumps({
+                    "id": response.id,
+                    "object": response.object,
+                    "created": response.created,
+                    "model": response.model,
+                    "choices": choices_data,
+                    "usage": response.usage,
+                }),
+                media_type="application/json",
+            )
             
         except AIRateLimitedError:
             raise HTTPException(status_code=429, detail="Rate limit exceeded")
@@ -282,6 +380,8 @@ async def proxy_chat(request: ChatRequestModel):
                 status_code=e.status_code or 502,
                 detail=redact_sensitive_data(e.message),
             )
+        finally:
+            await _release_client(client)
 
 
 @router.post("/models", response_model=ModelsResponseModel, summary="获取模型列表")
@@ -294,10 +394,7 @@ async def proxy_models(request: ModelsRequestModel) -> ModelsResponseModel:
     _log_request("/models", request.base_url)
     
     try:
-        client = AIClient(
-            base_url=request.base_url,
-            api_key=request.api_key,
-        )
+        client = _acquire_client(request.base_url, request.api_key)
     except (URLBlockedError, PrivateIPError) as e:
         raise _handle_security_error(e)
     
@@ -328,6 +425,8 @@ async def proxy_models(request: ModelsRequestModel) -> ModelsResponseModel:
             status_code=e.status_code or 502,
             detail=redact_sensitive_data(e.message),
         )
+    finally:
+        await _release_client(client)
 
 
 @router.post("/image", response_model=ImageResponseModel, summary="图像生成代理")
@@ -340,10 +439,7 @@ async def proxy_image(request: ImageRequestModel) -> ImageResponseModel:
     _log_request("/image", request.base_url)
     
     try:
-        client = AIClient(
-            base_url=request.base_url,
-            api_key=request.api_key,
-        )
+        client = _acquire_client(request.base_url, request.api_key)
     except (URLBlockedError, PrivateIPError) as e:
         raise _handle_security_error(e)
     
@@ -383,3 +479,5 @@ async def proxy_image(request: ImageRequestModel) -> ImageResponseModel:
             status_code=e.status_code or 502,
             detail=redact_sensitive_data(e.message),
         )
+    finally:
+        await _release_client(client)
@@ -4,12 +4,23 @@ POST /api/quack/import - Import character from Quack API or JSON
 POST /api/quack/preview - Preview character info (optional)
 """
 
-import io
-import json
+import asyncio
+import base64
+import copy
+import hashlib
+import re
+import struct
+import time
+import zlib
+from collections import OrderedDict
+from itertools import chain
 from typing import Literal, Optional
 
-from fastapi import APIRouter, HTTPException
+import orjson
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import Response
 from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
 
 from ..core import (
     ApiResponse,
@@ -18,8 +29,10 @@ from ..core import (
     ErrorCode,
     Lorebook,
     QuackClient,
+    build_png,
     export_to_png,
     extract_quack_id,
+    generate_export_filename,
     map_quack_lorebook_only,
     map_quack_to_v3,
 )
@@ -90,29 +103,98 @@ class QuackPreviewResult(BaseModel):
 # ============================================================
 
 
+_JSON_OBJECT_START = re.compile(r"\s*\{")
+
+
 def _try_parse_json(input_str: str) -> Optional[dict]:
     """尝试解析输入为 JSON (仅接受对象类型)"""
-    input_str = input_str.strip()
-    if not input_str.startswith("{"):
+    # 仅匹配前导空白 + "{"，不复制整段输入；orjson 自身可处理 JSON 空白
+    if not _JSON_OBJECT_START.match(input_str):
         return None
     try:
-        result = json.loads(input_str)
-        # 确保是 dict 类型
-        if not isinstance(result, dict):
+        result = orjson.loads(input_str)
+    except orjson.JSONDecodeError:
+        # 首尾可能带有非 JSON 空白 (如全角空格)，仅在失败时才复制一次
+        try:
+            result = orjson.loads(input_str.strip())
+        except orjson.JSONDecodeError:
             return None
-        return result
-    except json.JSONDecodeError:
+    # 确保是 dict 类型
+    if not isinstance(result, dict):
         return None
+    return result
+
+
+# 手动粘贴 JSON 的解析结果缓存: 输入摘要 -> (解析时间, 数据)
+# 前端通常先预览再导入同一段输入，第二次请求无需重新解析。
+# 调用方可能修改返回的 dict，因此每次返回缓存对象的深拷贝。
+_PARSED_INPUT_TTL_SECONDS = 300
+_PARSED_INPUT_CACHE_MAXSIZE = 64
+_parsed_input_cache: "OrderedDict[bytes, tuple[float, dict]]" = OrderedDict()
+
+
+def _parse_json_input(input_str: str) -> Optional[dict]:
+    """带短期缓存的 _try_parse_json (仅缓存解析成功的对象)"""
+    # ID/URL 输入直接返回，不计算摘要
+    if not _JSON_OBJECT_START.match(input_str):
+        return None
+
+    key = hashlib.blake2b(input_str.encode(), digest_size=16).digest()
+    now = time.monotonic()
+
+    entry = _parsed_input_cache.get(key)
+    if entry is not None:
+        stored_at, cached = entry
+        if now - stored_at < _PARSED_INPUT_TTL_SECONDS:
+            _parsed_input_cache.move_to_end(key)
+            return copy.deepcopy(cached)
+        del _parsed_input_cache[key]
+
+    data = _try_parse_json(input_str)
+    if data is None:
+        return None
+    _parsed_input_cache[key] = (now, data)
+    if len(_parsed_input_cache) > _PARSED_INPUT_CACHE_MAXSIZE:
+        _parsed_input_cache.popitem(last=False)
+    return copy.deepcopy(data)
+
+
+def _build_placeholder_png(size: int = 512) -> bytes:
+    """构造灰色占位符 PNG (RGBA, 8-bit)，直接拼装 chunk，无需 PIL"""
+    row = b"\x00" + b"\x80\x80\x80\xff" * size  # filter byte + 像素
+    ihdr = struct.pack(">IIBBBBB", size, size, 8, 6, 0, 0, 0)
+    idat = zlib.compress(row * size, 9)
+    return build_png([("IHDR", ihdr), ("IDAT", idat), ("IEND", b"")])
+
+
+# 内容恒定，导入时生成一次
+_PLACEHOLDER_PNG: bytes = _build_placeholder_png()
 
 
 def _generate_placeholder_png() -> bytes:
-    """生成占位符 PNG 图片 (1x1 透明像素)"""
-    from PIL import Image
-    
-    img = Image.new("RGBA", (512, 512), (128, 128, 128, 255))
-    buffer = io.BytesIO()
-    img.save(buffer, format="PNG")
-    return buffer.getvalue()
+    """返回占位符 PNG 图片 (512x512 灰色)"""
+    return _PLACEHOLDER_PNG
+
+
+def _collect_tags(raw_tags: list, from_image_tags: bool = False, limit: int = 10) -> list[str]:
+    """单次遍历收集非空标签，达到上限即停止
+
+    图片标签为 dict，取 label (回退 value)；其余按字符串处理。
+    """
+    out: list[str] = []
+    for t in raw_tags:
+        if from_image_tags:
+            if not isinstance(t, dict):
+                continue
+            value = t.get("label") or t.get("value")
+        else:
+            value = t
+        if not value:
+            continue
+        out.append(value if isinstance(value, str) else str(value))
+        if len(out) == limit:
+            break
+    return out
 
 
 def _extract_preview_from_quack(data: dict) -> QuackPreviewResult:
@@ -125,24 +207,32 @@ def _extract_preview_from_quack(data: dict) -> QuackPreviewResult:
     intro = data.get("intro", char.get("intro", ""))[:200]  # 截断
     
     tags = data.get("tags", [])
-    if not tags:
+    if tags:
+        tags = _collect_tags(tags)
+    else:
         image_tags = char.get("generateImage", {}).get("allTags", [])
-        tags = [t.get("label", t.get("value", "")) for t in image_tags if isinstance(t, dict)]
+        tags = _collect_tags(image_tags, from_image_tags=True)
     
-    attrs = char.get("attrs", []) + char.get("adviseAttrs", []) + char.get("customAttrs", [])
+    # 只需计数，避免拼接三个列表
+    attr_count = (
+        len(char.get("attrs", ()))
+        + len(char.get("adviseAttrs", ()))
+        + len(char.get("customAttrs", ()))
+    )
     
-    lorebook_count = 0
-    books = data.get("characterbooks", [])
-    for book in books if isinstance(books, list) else []:
-        if isinstance(book, dict):
-            lorebook_count += len(book.get("entryList", []))
+    books = data.get("characterbooks", ())
+    lorebook_count = (
+        sum(len(b.get("entryList", ())) for b in books if isinstance(b, dict))
+        if isinstance(books, list)
+        else 0
+    )
     
     return QuackPreviewResult(
         name=name,
         creator=creator,
         intro=intro,
-        tags=[str(t) for t in tags if t][:10],  # 最多 10 个标签
-        attr_count=len(attrs),
+        tags=tags,
+        attr_count=attr_count,
         lorebook_count=lorebook_count,
         source="json",
     )
@@ -157,21 +247,29 @@ def _extract_preview_from_quack(data: dict) -> QuackPreviewResult:
     "/import",
     response_model=ApiResponse[QuackImportResult],
     summary="从 Quack 导入角色卡",
-    description="支持两种模式: 1) 通过 ID/URL + Cookie 从 Quack API 获取; 2) 手动粘贴 JSON 数据",
+    description=(
+        "支持两种模式: 1) 通过 ID/URL + Cookie 从 Quack API 获取; 2) 手动粘贴 JSON 数据。"
+        "output_format=png 且 Accept 包含 image/png 时直接返回 PNG 二进制"
+    ),
+    responses={
+        200: {
+            "content": {"image/png": {}},
+            "description": "导入结果 (JSON)，或 PNG 图片 (Accept: image/png)",
+        }
+    },
 )
 async def import_from_quack(
     request: QuackImportRequest,
-) -> ApiResponse[QuackImportResult]:
+    accept: Optional[str] = Header(default=None),
+) -> ApiResponse[QuackImportResult] | Response:
     """导入 Quack 角色数据"""
-    import base64
-    
     warnings: list[str] = []
     source: Literal["api", "json"] = "api"
     quack_data: Optional[dict] = None
     lorebook_entries: list[dict] = []
     
     # 尝试解析为 JSON (手动粘贴模式)
-    json_data = _try_parse_json(request.quack_input)
+    json_data = _parse_json_input(request.quack_input)
     
     if json_data:
         # 手动粘贴 JSON 模式
@@ -180,10 +278,12 @@ async def import_from_quack(
         warnings.append("使用手动粘贴的 JSON 数据")
         
         # 尝试从 JSON 中提取世界书
-        books = json_data.get("characterbooks", [])
-        for book in books if isinstance(books, list) else []:
-            if isinstance(book, dict) and "entryList" in book:
-                lorebook_entries.extend(book.get("entryList", []))
+        books = json_data.get("characterbooks") or []
+        if not isinstance(books, list):
+            books = []
+        lorebook_entries = list(chain.from_iterable(
+            book.get("entryList") or () for book in books if isinstance(book, dict)
+        ))
     else:
         # API 获取模式
         quack_id = extract_quack_id(request.quack_input)
@@ -242,6 +342,8 @@ async def import_from_quack(
                     "hint": "如果 IP 被封禁，请使用手动粘贴 JSON 模式",
                 },
             )
+        finally:
+            await client.aclose()
     
     if not quack_data:
         raise HTTPException(
@@ -264,13 +366,12 @@ async def import_from_quack(
             )
         
         lorebook = map_quack_lorebook_only(lorebook_entries)
-        return ApiResponse(
-            success=True,
-            data=QuackImportResult(
+        return ApiResponse[QuackImportResult].ok(
+            QuackImportResult.model_construct(
                 lorebook=lorebook,
                 source=source,
                 warnings=warnings,
-            ),
+            )
         )
     
     # 完整卡片模式
@@ -278,29 +379,43 @@ async def import_from_quack(
     
     # PNG 输出
     if request.output_format == "png":
-        placeholder_png = _generate_placeholder_png()
-        result_png = export_to_png(placeholder_png, card, include_v2_compat=True)
-        png_base64 = base64.b64encode(result_png).decode("utf-8")
+        # 映射时已写入当前时间，导出时不再改动修改时间
+        result_png = await run_in_threadpool(
+            export_to_png,
+            _PLACEHOLDER_PNG,
+            card,
+            include_v2_compat=True,
+            update_modification_date=False,
+        )
+        
+        # 客户端接受二进制时直接返回 PNG，省去 Base64 编码与 33% 的体积膨胀
+        if accept and "image/png" in accept:
+            filename = generate_export_filename(card)
+            return Response(
+                content=result_png,
+                media_type="image/png",
+                headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+            )
+        
+        png_base64 = base64.b64encode(result_png).decode("ascii")
         warnings.append("使用占位符图片生成 PNG，请在前端替换为实际图片")
         
-        return ApiResponse(
-            success=True,
-            data=QuackImportResult(
+        return ApiResponse[QuackImportResult].ok(
+            QuackImportResult.model_construct(
                 card=card,
                 png_base64=png_base64,
                 source=source,
                 warnings=warnings,
-            ),
+            )
         )
     
     # JSON 输出
-    return ApiResponse(
-        success=True,
-        data=QuackImportResult(
+    return ApiResponse[QuackImportResult].ok(
+        QuackImportResult.model_construct(
             card=card,
             source=source,
             warnings=warnings,
-        ),
+        )
     )
 
 
@@ -316,13 +431,13 @@ async def preview_quack(
     """预览 Quack 角色信息"""
     
     # 尝试解析为 JSON
-    json_data = _try_parse_json(request.quack_input)
+    json_data = _parse_json_input(request.quack_input)
     
     if json_data:
         # 手动粘贴 JSON 模式
         result = _extract_preview_from_quack(json_data)
         result.source = "json"
-        return ApiResponse(success=True, data=result)
+        return ApiResponse[QuackPreviewResult].ok(result)
     
     # API 获取模式
     quack_id = extract_quack_id(request.quack_input)
@@ -344,7 +459,20 @@ async def preview_quack(
     client = QuackClient(cookies=cookies)
     
     try:
-        quack_data = await client.fetch_character_info(quack_id)
+        # 角色信息与世界书互不依赖，并发请求
+        quack_data, lorebook = await asyncio.gather(
+            client.fetch_character_info(quack_id),
+            client.fetch_lorebook(quack_id),
+            return_exceptions=True,
+        )
+        if isinstance(quack_data, BaseException):
+            raise quack_data
+        result = _extract_preview_from_quack(quack_data)
+        result.source = "api"
+        
+        # 获取世界书数量 (失败时忽略)
+        if not isinstance(lorebook, BaseException):
+            result.lorebook_count = len(lorebook)
     except UnauthorizedError as e:
         raise HTTPException(
             status_code=401,
@@ -377,18 +505,10 @@ async def preview_quack(
                 "error_code": ErrorCode.NETWORK_ERROR,
             },
         )
+    finally:
+        await client.aclose()
     
-    result = _extract_preview_from_quack(quack_data)
-    result.source = "api"
-    
-    # 获取世界书数量
-    try:
-        lorebook = await client.fetch_lorebook(quack_id)
-        result.lorebook_count = len(lorebook)
-    except Exception:
-        pass
-    
-    return ApiResponse(success=True, data=result)
+    return ApiResponse[QuackPreviewResult].ok(result)
 
 
 __all__ = [
@@ -32,12 +32,15 @@ from .png_chunks import (
     InvalidPngError,
     PngChunkError,
     build_png,
+    decode_text_chunks,
     extract_idat_chunks,
     get_card_data,
+    get_card_data_from_chunks,
     inject_text_chunk,
     read_png_chunks,
     read_text_chunks,
     remove_text_chunk,
+    set_text_chunk,
 )
 from .v2_to_v3 import (
     migrate_v2_to_v3,
@@ -54,8 +57,10 @@ from .card_import import (
 )
 from .card_export import (
     CardExportError,
+    CardExportVerificationError,
     export_to_png,
     verify_export,
+    verify_export_fast,
     generate_export_filename,
 )
 from .token_estimator import (
@@ -68,6 +73,7 @@ from .quack_client import (
     CookieParser,
     QuackClient,
     extract_quack_id,
+    clear_response_cache,
     DEFAULT_USER_AGENT,
 )
 from .quack_mapper import (
@@ -112,12 +118,15 @@ __all__ = [
     "InvalidPngError",
     "PngChunkError",
     "build_png",
+    "decode_text_chunks",
     "extract_idat_chunks",
     "get_card_data",
+    "get_card_data_from_chunks",
     "inject_text_chunk",
     "read_png_chunks",
     "read_text_chunks",
     "remove_text_chunk",
+    "set_text_chunk",
     # V2 to V3 migration
     "migrate_v2_to_v3",
     "migrate_lorebook",
@@ -131,8 +140,10 @@ __all__ = [
     "detect_file_type",
     # Card export
     "CardExportError",
+    "CardExportVerificationError",
     "export_to_png",
     "verify_export",
+    "verify_export_fast",
     "generate_export_filename",
     # Token estimation
     "estimate_tokens",
@@ -143,6 +154,7 @@ __all__ = [
     "CookieParser",
     "QuackClient",
     "extract_quack_id",
+    "clear_response_cache",
     "DEFAULT_USER_AGENT",
     # Quack mapper
     "format_attrs",
@@ -4,17 +4,23 @@ AI 客户端模块
 提供 OpenAI 兼容的 AI 服务客户端，支持流式和非流式响应。
 """
 
-import json
+import asyncio
+from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
-from typing import Any, AsyncIterator, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
 
 import httpx
+import orjson
 
 from app.settings import get_settings
 from app.core.security import validate_url_security, redact_sensitive_data
 
 
-@dataclass
+# 值为 None 时不发送的可选参数（stop 另按空列表过滤）
+_OPTIONAL_CHAT_FIELDS = ("max_tokens", "top_p", "frequency_penalty", "presence_penalty")
+
+
+@dataclass(slots=True)
 class Message:
     """聊天消息"""
     role: str  # "system" | "user" | "assistant"
@@ -22,7 +28,7 @@ class Message:
     name: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class ChatRequest:
     """聊天请求"""
     messages: List[Message]
@@ -37,31 +43,35 @@ class ChatRequest:
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为 API 请求字典。"""
+        messages = self.messages
+        if any(m.name is not None for m in messages):
+            message_dicts = [
+                {"role": m.role, "content": m.content, "name": m.name}
+                if m.name is not None
+                else {"role": m.role, "content": m.content}
+                for m in messages
+            ]
+        else:
+            message_dicts = [{"role": m.role, "content": m.content} for m in messages]
+        
         data = {
             "model": self.model,
-            "messages": [
-                {k: v for k, v in {"role": m.role, "content": m.content, "name": m.name}.items() if v is not None}
-                for m in self.messages
-            ],
+            "messages": message_dicts,
             "temperature": self.temperature,
             "stream": self.stream,
         }
         
-        if self.max_tokens is not None:
-            data["max_tokens"] = self.max_tokens
-        if self.top_p is not None:
-            data["top_p"] = self.top_p
-        if self.frequency_penalty is not None:
-            data["frequency_penalty"] = self.frequency_penalty
-        if self.presence_penalty is not None:
-            data["presence_penalty"] = self.presence_penalty
+        for key in _OPTIONAL_CHAT_FIELDS:
+            value = getattr(self, key)
+            if value is not None:
+                data[key] = value
         if self.stop:
             data["stop"] = self.stop
         
         return data
 
 
-@dataclass
+@dataclass(slots=True)
 class ChatChoice:
     """聊天响应选项"""
     index: int
@@ -70,7 +80,7 @@ class ChatChoice:
     finish_reason: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class ChatResponse:
     """聊天响应"""
     id: str
@@ -81,7 +91,7 @@ class ChatResponse:
     usage: Optional[Dict[str, int]] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class StreamChunk:
     """流式响应块"""
     id: str
@@ -96,7 +106,7 @@ class StreamChunk:
         return len(self.choices) > 0 and self.choices[0].finish_reason is not None
 
 
-@dataclass
+@dataclass(slots=True)
 class ModelInfo:
     """模型信息"""
     id: str
@@ -105,14 +115,14 @@ class ModelInfo:
     owned_by: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class ModelsResponse:
     """模型列表响应"""
     object: str = "list"
     data: List[ModelInfo] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class ImageRequest:
     """图像生成请求"""
     prompt: str
@@ -135,7 +145,7 @@ class ImageRequest:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class ImageData:
     """图像数据"""
     url: Optional[str] = None
@@ -143,7 +153,7 @@ class ImageData:
     revised_prompt: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class ImageResponse:
     """图像生成响应"""
     created: int
@@ -188,6 +198,28 @@ class RateLimitedError(AIClientError):
         super().__init__(message, "RATE_LIMITED", 429)
 
 
+# 长连接池上限：同一上游的并发流式请求可复用 keep-alive 连接
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=100, max_connections=200)
+
+# 因事件循环切换而被替换的旧连接池，后台关闭期间保留任务的强引用
+_closing_tasks: "Set[asyncio.Task[None]]" = set()
+
+
+async def _aclose_quietly(client: httpx.AsyncClient) -> None:
+    """关闭旧连接池；其所属事件循环可能已关闭，失败时忽略。"""
+    try:
+        await client.aclose()
+    except Exception:
+        pass
+
+
+def _schedule_aclose(client: httpx.AsyncClient) -> None:
+    """在当前事件循环中后台关闭连接池。"""
+    task = asyncio.get_running_loop().create_task(_aclose_quietly(client))
+    _closing_tasks.add(task)
+    task.add_done_callback(_closing_tasks.discard)
+
+
 class AIClient:
     """OpenAI 兼容 AI 客户端"""
     
@@ -202,232 +234,247 @@ class AIClient:
         self.api_key = api_key
         self.timeout = timeout
         self.max_response_size = max_response_size
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        }
         
         validate_url_security(self.base_url)
     
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """获取复用的 httpx 客户端（惰性创建，保持连接池以复用 TCP/TLS 连接）。
+        
+        连接池绑定创建它的事件循环；在其他事件循环中使用时新建连接池，旧的在后台关闭。
+        """
+        loop = asyncio.get_running_loop()
+        client = self._http_client
+        if client is None or client.is_closed or self._http_client_loop is not loop:
+            if client is not None and not client.is_closed:
+                _schedule_aclose(client)
+            client = httpx.AsyncClient(timeout=self.timeout, limits=_HTTP_LIMITS)
+            self._http_client = client
+            self._http_client_loop = loop
+        return client
+    
+    async def aclose(self) -> None:
+        """关闭底层连接池。"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+            self._http_client_loop = None
+    
     def _get_headers(self) -> Dict[str, str]:
-        """获取请求头。"""
-        return {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
+        """获取请求头（副本，调用方可安全修改）。"""
+        return self._headers.copy()
     
-    async def chat(self, request: ChatRequest) -> ChatResponse:
-        """发送聊天请求（非流式）。"""
-        request.stream = False
+    @asynccontextmanager
+    async def _translate_errors(self) -> AsyncIterator[None]:
+        """将 httpx 传输层异常映射为 AIClientError 子类。"""
+        try:
+            yield
+        except httpx.TimeoutException:
+            raise TimeoutError()
+        except (httpx.NetworkError, httpx.RemoteProtocolError) as e:
+            raise NetworkError(f"Network error: {str(e)}")
+    
+    @staticmethod
+    async def _raise_for_status(response: httpx.Response) -> None:
+        """429 映射为 RateLimitedError，其余 4xx/5xx 映射为 UpstreamError。"""
+        status_code = response.status_code
+        if status_code < 400:
+            return
+        if status_code == 429:
+            raise RateLimitedError()
+        await response.aread()
+        raise UpstreamError(f"API error: {response.text}", status_code=status_code)
+    
+    async def _request_json(
+        self, method: str, path: str, content: Optional[bytes] = None
+    ) -> Dict[str, Any]:
+        """发送非流式请求并解析 JSON 响应体。
         
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
+        先按 Content-Length 预检，超限时不读取响应体；
+        未声明长度时边读边计数，超过 max_response_size 即中止。
+        """
+        client = self._get_http_client()
+        async with self._translate_errors():
+            request = client.build_request(
+                method,
+                f"{self.base_url}{path}",
+                headers=self._headers,
+                content=content,
+            )
+            response = await client.send(request, stream=True)
             try:
-                response = await client.post(
-                    f"{self.base_url}/v1/chat/completions",
-                    headers=self._get_headers(),
-                    json=request.to_dict(),
-                )
-                
-                if response.status_code == 429:
-                    raise RateLimitedError()
-                
-                if response.status_code >= 400:
-                    error_body = response.text
-                    raise UpstreamError(
-                        f"API error: {error_body}",
-                        status_code=response.status_code,
-                    )
+                await self._raise_for_status(response)
                 
-                data = response.json()
-                return self._parse_chat_response(data)
+                content_length = response.headers.get("content-length", "")
+                if content_length.isdigit() and int(content_length) > self.max_response_size:
+                    raise UpstreamError("Response too large")
                 
-            except httpx.TimeoutException:
-                raise TimeoutError()
-            except httpx.NetworkError as e:
-                raise NetworkError(f"Network error: {str(e)}")
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body += chunk
+                    if len(body) > self.max_response_size:
+                        raise UpstreamError("Response too large")
+            finally:
+                await response.aclose()
+        
+        data: Dict[str, Any] = orjson.loads(body)
+        return data
     
+    async def chat(self, request: ChatRequest) -> ChatResponse:
+        """发送聊天请求（非流式）。"""
+        request.stream = False
+        
+        data = await self._request_json(
+            "POST", "/v1/chat/completions", orjson.dumps(request.to_dict())
+        )
+        return self._parse_chat_response(data)
+
     async def chat_stream(self, request: ChatRequest) -> AsyncIterator[StreamChunk]:
         """发送流式聊天请求。"""
         request.stream = True
         
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                async with client.stream(
-                    "POST",
-                    f"{self.base_url}/v1/chat/completions",
-                    headers=self._get_headers(),
-                    json=request.to_dict(),
-                ) as response:
-                    if response.status_code == 429:
-                        raise RateLimitedError()
-                    
-                    if response.status_code >= 400:
-                        error_body = await response.aread()
-                        raise UpstreamError(
-                            f"API error: {error_body.decode()}",
-                            status_code=response.status_code,
-                        )
-                    
-                    buffer = ""
-                    bytes_read = 0
-                    
-                    async for chunk in response.aiter_text():
-                        bytes_read += len(chunk.encode())
-                        if bytes_read > self.max_response_size:
-                            raise UpstreamError("Response too large")
-                        
-                        buffer += chunk
-                        
-                        while "\n" in buffer:
-                            line, buffer = buffer.split("\n", 1)
-                            line = line.strip()
-                            
-                            if not line:
-                                continue
-                            
-                            if line.startswith("data: "):
-                                data_str = line[6:]
-                                
-                                if data_str == "[DONE]":
-                                    return
-                                
-                                try:
-                                    data = json.loads(data_str)
-                                    yield self._parse_stream_chunk(data)
-                                except json.JSONDecodeError:
-                                    continue
-                            
-            except httpx.TimeoutException:
-                raise TimeoutError()
-            except httpx.NetworkError as e:
-                raise NetworkError(f"Network error: {str(e)}")
-    
-    async def list_models(self) -> ModelsResponse:
-        """获取模型列表。"""
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.get(
-                    f"{self.base_url}/v1/models",
-                    headers=self._get_headers(),
-                )
+        client = self._get_http_client()
+        async with self._translate_errors(), client.stream(
+            "POST",
+            f"{self.base_url}/v1/chat/completions",
+            headers=self._headers,
+            content=orjson.dumps(request.to_dict()),
+        ) as response:
+            await self._raise_for_status(response)
+            
+            async for line in _aiter_byte_lines(response, self.max_response_size):
+                if not line.startswith(b"data: "):
+                    continue
                 
-                if response.status_code == 429:
-                    raise RateLimitedError()
+                # strip 同时去掉 CRLF 换行留下的 \r
+                data_bytes = line[6:].strip()
                 
-                if response.status_code >= 400:
-                    error_body = response.text
-                    raise UpstreamError(
-                        f"API error: {error_body}",
-                        status_code=response.status_code,
-                    )
+                if data_bytes == b"[DONE]":
+                    return
                 
-                data = response.json()
-                return self._parse_models_response(data)
-                
-            except httpx.TimeoutException:
-                raise TimeoutError()
-            except httpx.NetworkError as e:
-                raise NetworkError(f"Network error: {str(e)}")
-    
+                # orjson 直接解析 UTF-8 字节，非法 JSON/编码的行跳过
+                try:
+                    data = orjson.loads(data_bytes)
+                except orjson.JSONDecodeError:
+                    continue
+                yield self._parse_stream_chunk(data)
+
+    async def list_models(self) -> ModelsResponse:
+        """获取模型列表。"""
+        data = await self._request_json("GET", "/v1/models")
+        return self._parse_models_response(data)
+
     async def generate_image(self, request: ImageRequest) -> ImageResponse:
         """生成图像。"""
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.post(
-                    f"{self.base_url}/v1/images/generations",
-                    headers=self._get_headers(),
-                    json=request.to_dict(),
-                )
-                
-                if response.status_code == 429:
-                    raise RateLimitedError()
-                
-                if response.status_code >= 400:
-                    error_body = response.text
-                    raise UpstreamError(
-                        f"API error: {error_body}",
-                        status_code=response.status_code,
-                    )
-                
-                data = response.json()
-                return self._parse_image_response(data)
-                
-            except httpx.TimeoutException:
-                raise TimeoutError()
-            except httpx.NetworkError as e:
-                raise NetworkError(f"Network error: {str(e)}")
-    
+        data = await self._request_json(
+            "POST", "/v1/images/generations", orjson.dumps(request.to_dict())
+        )
+        return self._parse_image_response(data)
+
     def _parse_chat_response(self, data: Dict[str, Any]) -> ChatResponse:
         """解析聊天响应。"""
-        choices = []
-        for choice_data in data.get("choices", []):
-            message_data = choice_data.get("message", {})
-            message = Message(
-                role=message_data.get("role", "assistant"),
-                content=message_data.get("content", ""),
-            )
-            choices.append(ChatChoice(
-                index=choice_data.get("index", 0),
-                message=message,
-                finish_reason=choice_data.get("finish_reason"),
-            ))
-        
         return ChatResponse(
             id=data.get("id", ""),
             object=data.get("object", "chat.completion"),
             created=data.get("created", 0),
             model=data.get("model", ""),
-            choices=choices,
+            choices=[
+                ChatChoice(
+                    index=c.get("index", 0),
+                    message=_parse_message(c.get("message", {})),
+                    finish_reason=c.get("finish_reason"),
+                )
+                for c in data.get("choices", ())
+            ],
             usage=data.get("usage"),
         )
     
     def _parse_stream_chunk(self, data: Dict[str, Any]) -> StreamChunk:
-        """解析流式响应块。"""
-        choices = []
-        for choice_data in data.get("choices", []):
-            delta = choice_data.get("delta", {})
-            choices.append(ChatChoice(
-                index=choice_data.get("index", 0),
-                delta=delta,
-                finish_reason=choice_data.get("finish_reason"),
-            ))
-        
+        """解析流式响应块（每个 SSE 事件调用一次）。"""
         return StreamChunk(
             id=data.get("id", ""),
             object=data.get("object", "chat.completion.chunk"),
             created=data.get("created", 0),
             model=data.get("model", ""),
-            choices=choices,
+            choices=[
+                ChatChoice(
+                    index=c.get("index", 0),
+                    delta=c.get("delta", {}),
+                    finish_reason=c.get("finish_reason"),
+                )
+                for c in data.get("choices", ())
+            ],
         )
     
     def _parse_models_response(self, data: Dict[str, Any]) -> ModelsResponse:
         """解析模型列表响应。"""
-        models = []
-        for model_data in data.get("data", []):
-            models.append(ModelInfo(
-                id=model_data.get("id", ""),
-                object=model_data.get("object", "model"),
-                created=model_data.get("created"),
-                owned_by=model_data.get("owned_by"),
-            ))
-        
         return ModelsResponse(
             object=data.get("object", "list"),
-            data=models,
+            data=[
+                ModelInfo(
+                    id=m.get("id", ""),
+                    object=m.get("object", "model"),
+                    created=m.get("created"),
+                    owned_by=m.get("owned_by"),
+                )
+                for m in data.get("data", ())
+            ],
         )
     
     def _parse_image_response(self, data: Dict[str, Any]) -> ImageResponse:
         """解析图像生成响应。"""
-        images = []
-        for img_data in data.get("data", []):
-            images.append(ImageData(
-                url=img_data.get("url"),
-                b64_json=img_data.get("b64_json"),
-                revised_prompt=img_data.get("revised_prompt"),
-            ))
-        
         return ImageResponse(
             created=data.get("created", 0),
-            data=images,
+            data=[
+                ImageData(
+                    url=img.get("url"),
+                    b64_json=img.get("b64_json"),
+                    revised_prompt=img.get("revised_prompt"),
+                )
+                for img in data.get("data", ())
+            ],
         )
 
 
+async def _aiter_byte_lines(
+    response: httpx.Response, max_size: int
+) -> AsyncIterator[bytearray]:
+    """按 \\n 切分响应字节流，累计字节数超过 max_size 时抛出 UpstreamError。
+
+    按收到的字节计数而不是按行检查，没有换行的超长响应同样会被中止。
+    """
+    bytes_read = 0
+    pending = bytearray()
+    async for chunk in response.aiter_bytes():
+        bytes_read += len(chunk)
+        if bytes_read > max_size:
+            raise UpstreamError("Response too large")
+        
+        pending += chunk
+        if b"\n" not in chunk:
+            continue
+        lines = pending.split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line
+    
+    if pending:
+        yield pending
+
+
+def _parse_message(message_data: Dict[str, Any]) -> Message:
+    """解析响应中的 message 对象。"""
+    return Message(
+        role=message_data.get("role", "assistant"),
+        content=message_data.get("content", ""),
+    )
+
+
 __all__ = [
     "Message",
     "ChatRequest",
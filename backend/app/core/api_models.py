@@ -46,6 +46,15 @@ class ApiResponse(BaseModel, Generic[T]):
     error: Optional[str] = Field(default=None, description="错误消息")
     error_code: Optional[ErrorCode] = Field(default=None, description="错误码")
 
+    @classmethod
+    def ok(cls, data: T) -> "ApiResponse[T]":
+        """构造成功响应。
+
+        跳过 Pydantic 校验，仅用于服务端构建、已校验过的数据。
+        应在参数化类型上调用，例如 ``ApiResponse[ParseResult].ok(result)``。
+        """
+        return cls.model_construct(success=True, data=data)
+
 
 # ============================================================
 # 卡片相关模型
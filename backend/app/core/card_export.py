@@ -5,12 +5,18 @@ Optionally includes chara chunk for V2 compatibility.
 """
 
 import json
+import re
 import time
-from typing import Dict, Optional
+from typing import Optional
+
+import orjson
 
 from .card_import import import_from_png
 from .card_models import CharacterCardV3
-from .png_chunks import inject_text_chunk
+from .png_chunks import (
+    get_card_data,
+    inject_text_chunk,
+)
 
 
 class CardExportError(Exception):
@@ -19,49 +25,89 @@ class CardExportError(Exception):
     pass
 
 
-def _prepare_v3_json(card: CharacterCardV3, update_modification_date: bool = True) -> str:
+class CardExportVerificationError(CardExportError):
+    """Raised by export_to_png(verify=True) when the written chunk does not match."""
+
+    pass
+
+
+# V3-only fields dropped from the V2-compatible chara chunk
+_V2_EXCLUDED_FIELDS = frozenset({
+    "group_only_greetings",
+    "nickname",
+    "creator_notes_multilingual",
+    "source",
+    "creation_date",
+    "modification_date",
+})
+
+# Anything other than Unicode alphanumerics, "_", "-" or space (\w == isalnum() or "_")
+_UNSAFE_FILENAME_CHARS = re.compile(r"[^\w\- ]")
+
+
+def _dumps(data: dict) -> str:
+    """Serialize compactly with orjson, falling back to json for integers beyond 64 bits."""
+    try:
+        return orjson.dumps(data).decode("utf-8")
+    except TypeError:
+        return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def _v3_json_from_dict(data: dict, update_modification_date: bool = True) -> str:
     """Prepare V3 JSON string for embedding.
 
     Args:
-        card: CharacterCardV3 model
+        data: card.model_dump(mode="json") output; modified in place
         update_modification_date: Whether to set modification_date to current time
 
     Returns:
         JSON string (no extra whitespace)
     """
-    data = card.model_dump(mode="json", exclude_none=False)
-
     if update_modification_date:
         data["data"]["modification_date"] = int(time.time())
 
-    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return _dumps(data)
 
 
-def _prepare_v2_json(card: CharacterCardV3) -> str:
+def _v2_json_from_dict(data: dict) -> str:
     """Prepare V2-compatible JSON string for chara chunk.
 
     Flattens the V3 structure to V2 format (data fields at root level).
 
     Args:
-        card: CharacterCardV3 model
+        data: card.model_dump(mode="json") output; not modified
 
     Returns:
         JSON string (V2 format)
     """
-    v3_data = card.model_dump(mode="json", exclude_none=False)
+    v2_data = {k: v for k, v in data["data"].items() if k not in _V2_EXCLUDED_FIELDS}
+    return _dumps(v2_data)
 
-    v2_data: Dict = {}
-    if "data" in v3_data:
-        v2_data = v3_data["data"].copy()
 
-    v2_data.pop("group_only_greetings", None)
-    v2_data.pop("nickname", None)
-    v2_data.pop("creator_notes_multilingual", None)
-    v2_data.pop("source", None)
-    v2_data.pop("creation_date", None)
-    v2_data.pop("modification_date", None)
+def _card_chunk_texts(
+    card: CharacterCardV3, include_v2_compat: bool, update_modification_date: bool
+) -> list[tuple[str, str]]:
+    """Encode the card as (keyword, JSON) pairs in write order: ccv3, then chara."""
+    # Dump once; both chunk payloads are encoded from the same dict
+    data = card.model_dump(mode="json")
 
-    return json.dumps(v2_data, ensure_ascii=False, separators=(",", ":"))
+    texts = [("ccv3", _v3_json_from_dict(data, update_modification_date))]
+    if include_v2_compat:
+        # modification_date is excluded from V2, so the update above is harmless
+        texts.append(("chara", _v2_json_from_dict(data)))
+    return texts
+
+
+def _splice_text_chunks(png_data: bytes, texts: list[tuple[str, str]]) -> bytes:
+    """Write each (keyword, text) as a tEXt chunk, replacing any existing one.
+
+    Other chunks are copied with their original CRCs, so only the new text
+    chunks are hashed, however large the image data is.
+    """
+    result = png_data
+    for keyword, text in texts:
+        result = inject_text_chunk(result, keyword, text, replace=True)
+    return result
 
 
 def export_to_png(
@@ -69,6 +115,7 @@ def export_to_png(
     card: CharacterCardV3,
     include_v2_compat: bool = True,
     update_modification_date: bool = True,
+    verify: bool = False,
 ) -> bytes:
     """Export character card to PNG with ccv3 chunk.
 
@@ -77,25 +124,71 @@ def export_to_png(
         card: CharacterCardV3 to embed
         include_v2_compat: If True, also write chara chunk for V2 compatibility
         update_modification_date: If True, set modification_date to current time
+        verify: If True, check the written ccv3 chunk with verify_export_fast
 
     Returns:
         Modified PNG bytes with embedded card data
 
     Raises:
         CardExportError: If export fails
+        CardExportVerificationError: If verify is set and the ccv3 chunk does not match
     """
     try:
-        v3_json = _prepare_v3_json(card, update_modification_date)
-        result = inject_text_chunk(png_data, "ccv3", v3_json, replace=True)
-
-        if include_v2_compat:
-            v2_json = _prepare_v2_json(card)
-            result = inject_text_chunk(result, "chara", v2_json, replace=True)
-
-        return result
+        texts = _card_chunk_texts(card, include_v2_compat, update_modification_date)
+        result = _splice_text_chunks(png_data, texts)
     except Exception as e:
         raise CardExportError(f"Failed to export card: {e}")
 
+    if verify and not verify_export_fast(result, texts[0][1]):
+        raise CardExportVerificationError(
+            "Export verification failed: ccv3 chunk does not match the card"
+        )
+
+    return result
+
+
+def _compare_dicts(d1, d2, path=""):
+    """Recursively compare two JSON-like values, reporting the first difference."""
+    if type(d1) != type(d2):
+        return False, f"Type mismatch at {path}"
+    if isinstance(d1, dict):
+        for key in set(d1.keys()) | set(d2.keys()):
+            if key not in d1:
+                return False, f"Missing key in original: {path}.{key}"
+            if key not in d2:
+                return False, f"Missing key in reimported: {path}.{key}"
+            ok, msg = _compare_dicts(d1[key], d2[key], f"{path}.{key}")
+            if not ok:
+                return False, msg
+    elif isinstance(d1, list):
+        if len(d1) != len(d2):
+            return False, f"List length mismatch at {path}"
+        for i, (v1, v2) in enumerate(zip(d1, d2)):
+            ok, msg = _compare_dicts(v1, v2, f"{path}[{i}]")
+            if not ok:
+                return False, msg
+    else:
+        if d1 != d2:
+            return False, f"Value mismatch at {path}: {d1} vs {d2}"
+    return True, None
+
+
+def verify_export_fast(exported_png: bytes, expected_v3_json: str) -> bool:
+    """Check that the PNG's ccv3 chunk holds exactly the JSON that was written.
+
+    A chunk lookup and a string compare, with no model validation. Use
+    verify_export to check a PNG against a card from elsewhere.
+
+    Args:
+        exported_png: PNG bytes after export
+        expected_v3_json: The V3 JSON string embedded by the export
+
+    Returns:
+        True if the ccv3 chunk decodes to expected_v3_json
+    """
+    result = get_card_data(exported_png)
+    return result is not None and result[0] == "ccv3" and result[1] == expected_v3_json
+
 
 def verify_export(
     exported_png: bytes,
@@ -130,36 +223,16 @@ def verify_export(
         return False, "description content mismatch"
 
     if strict:
-        orig_dict = original_card.model_dump(mode="json", exclude={"data": {"modification_date"}})
-        reimp_dict = reimported.model_dump(mode="json", exclude={"data": {"modification_date"}})
-
-        def compare_dicts(d1, d2, path=""):
-            if type(d1) != type(d2):
-                return False, f"Type mismatch at {path}"
-            if isinstance(d1, dict):
-                for key in set(d1.keys()) | set(d2.keys()):
-                    if key not in d1:
-                        return False, f"Missing key in original: {path}.{key}"
-                    if key not in d2:
-                        return False, f"Missing key in reimported: {path}.{key}"
-                    ok, msg = compare_dicts(d1[key], d2[key], f"{path}.{key}")
-                    if not ok:
-                        return False, msg
-            elif isinstance(d1, list):
-                if len(d1) != len(d2):
-                    return False, f"List length mismatch at {path}"
-                for i, (v1, v2) in enumerate(zip(d1, d2)):
-                    ok, msg = compare_dicts(v1, v2, f"{path}[{i}]")
-                    if not ok:
-                        return False, msg
-            else:
-                if d1 != d2:
-                    return False, f"Value mismatch at {path}: {d1} vs {d2}"
-            return True, None
-
-        ok, msg = compare_dicts(orig_dict, reimp_dict)
-        if not ok:
-            return False, msg
+        # Fast path: identical canonical JSON means identical structures.
+        # Only on mismatch walk the dicts to report where they differ.
+        exclude = {"data": {"modification_date"}}
+        if original_card.model_dump_json(exclude=exclude) != reimported.model_dump_json(exclude=exclude):
+            ok, msg = _compare_dicts(
+                original_card.model_dump(mode="json", exclude=exclude),
+                reimported.model_dump(mode="json", exclude=exclude),
+            )
+            if not ok:
+                return False, msg
 
     return True, None
 
@@ -176,7 +249,7 @@ def generate_export_filename(card: CharacterCardV3) -> str:
         Filename string
     """
     name = card.data.name or "character"
-    safe_name = "".join(c if c.isalnum() or c in "-_ " else "_" for c in name)
+    safe_name = _UNSAFE_FILENAME_CHARS.sub("_", name)
     safe_name = safe_name.strip()[:50]
 
     timestamp = time.strftime("%Y%m%d_%H%M%S")
@@ -186,7 +259,9 @@ def generate_export_filename(card: CharacterCardV3) -> str:
 
 __all__ = [
     "CardExportError",
+    "CardExportVerificationError",
     "export_to_png",
     "verify_export",
+    "verify_export_fast",
     "generate_export_filename",
 ]
@@ -4,16 +4,26 @@ Handles PNG and JSON import, normalizing to CharacterCardV3 format.
 Import priority: ccv3 > chara for PNG files.
 """
 
-import json
+import base64
+import binascii
+import re
 from io import BytesIO
-from typing import Literal, Tuple, Union
+from typing import Literal, Optional, Tuple, Union
 
+import orjson
 from PIL import Image
 
 from .card_models import CharacterCardV3
-from .png_chunks import InvalidPngError, get_card_data
+from .png_chunks import (
+    PNG_SIGNATURE,
+    InvalidPngError,
+    get_card_data,
+)
 from .v2_to_v3 import is_v2_format, migrate_v2_to_v3
 
+# pydantic-core validator, called directly to skip model_validate's wrapper
+_validate_v3 = CharacterCardV3.__pydantic_validator__.validate_python
+
 
 class CardImportError(Exception):
     """Raised when card import fails."""
@@ -35,13 +45,11 @@ def import_from_json(
     Raises:
         CardImportError: If JSON is invalid or missing required fields
     """
-    if isinstance(json_data, bytes):
-        json_data = json_data.decode("utf-8")
-
-    if isinstance(json_data, str):
+    if isinstance(json_data, (str, bytes)):
+        # orjson parses UTF-8 bytes directly, without decoding to str first
         try:
-            data = json.loads(json_data)
-        except json.JSONDecodeError as e:
+            data = orjson.loads(json_data)
+        except orjson.JSONDecodeError as e:
             raise CardImportError(f"Invalid JSON: {e}")
     else:
         data = json_data
@@ -53,7 +61,7 @@ def import_from_json(
         if "data" not in data:
             raise CardImportError("V3 card missing 'data' field")
         try:
-            card = CharacterCardV3.model_validate(data)
+            card = _validate_v3(data)
             return card, "v3"
         except Exception as e:
             raise CardImportError(f"Invalid V3 card structure: {e}")
@@ -96,6 +104,13 @@ def import_from_png(
     except InvalidPngError as e:
         raise CardImportError(f"Invalid PNG file: {e}")
 
+    return _import_from_card_chunk(result)
+
+
+def _import_from_card_chunk(
+    result: tuple[str, str] | None,
+) -> Tuple[CharacterCardV3, Literal["v2", "v3"], bool]:
+    """Build a card from the (chunk_type, json_string) picked out of a PNG."""
     if result is None:
         raise CardImportError("PNG contains no character card data (no ccv3 or chara chunk)")
 
@@ -134,12 +149,53 @@ def import_from_image(image_data: bytes) -> bytes:
             img = img.convert("RGB")
 
         output = BytesIO()
-        img.save(output, format="PNG")
+        # Only a container for the card chunks: fastest DEFLATE level, no optimize pass
+        img.save(output, format="PNG", compress_level=1, optimize=False)
         return output.getvalue()
     except Exception as e:
         raise CardImportError(f"Failed to convert image to PNG: {e}")
 
 
+# img.info keys that may carry card JSON in non-PNG images, in priority order.
+# JPEG COM and GIF comment extensions both surface as "comment".
+_IMAGE_METADATA_KEYS = ("ccv3", "chara", "comment")
+
+
+def _try_read_embedded_metadata(img: Image.Image) -> Optional[tuple[str, str]]:
+    """Look for card JSON in an image's own metadata, without decoding pixels.
+
+    Values may be raw JSON or base64-encoded JSON, as in PNG card chunks.
+
+    Returns:
+        Tuple of (keyword, json_string) like get_card_data, or None if not found
+    """
+    for key in _IMAGE_METADATA_KEYS:
+        value = img.info.get(key)
+        if not value:
+            continue
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        value = value.strip()
+        if not value.startswith(b"{"):
+            try:
+                value = base64.b64decode(value)
+            except (binascii.Error, ValueError):
+                continue
+            if not value.lstrip().startswith(b"{"):
+                continue
+        try:
+            text = value.decode("utf-8")
+        except UnicodeDecodeError:
+            continue
+        return ("ccv3" if key == "ccv3" else "chara", text)
+    return None
+
+
+# JPEG, GIF87a, GIF89a, BMP
+_IMAGE_MAGICS = (b"\xff\xd8\xff", b"GIF87a", b"GIF89a", b"BM")
+_JSON_START = re.compile(rb"\s*[{\[]")
+
+
 def detect_file_type(data: bytes) -> Literal["png", "json", "image"]:
     """Detect file type from bytes.
 
@@ -149,20 +205,16 @@ def detect_file_type(data: bytes) -> Literal["png", "json", "image"]:
     Returns:
         File type: 'png', 'json', or 'image' (other image formats)
     """
-    if data[:8] == b"\x89PNG\r\n\x1a\n":
+    if data.startswith(PNG_SIGNATURE):
         return "png"
 
-    if data[:3] == b"\xff\xd8\xff":
+    if data.startswith(_IMAGE_MAGICS):
         return "image"
     if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
         return "image"
-    if data[:6] in (b"GIF87a", b"GIF89a"):
-        return "image"
-    if data[:2] == b"BM":
-        return "image"
 
-    stripped = data.lstrip()
-    if stripped and stripped[0:1] in (b"{", b"["):
+    # Anchored match skips leading whitespace without copying the buffer
+    if _JSON_START.match(data):
         return "json"
 
     return "image"
@@ -193,6 +245,18 @@ def import_card(
         return card, fmt, False
 
     if file_type == "image":
+        # Cards stored in the image's own metadata need no PNG re-encode
+        try:
+            with Image.open(BytesIO(data)) as img:
+                embedded = _try_read_embedded_metadata(img)
+        except Exception:
+            embedded = None
+        if embedded is not None:
+            try:
+                return _import_from_card_chunk(embedded)
+            except CardImportError:
+                pass
+
         png_data = import_from_image(data)
         try:
             card, fmt, _ = import_from_png(png_data)
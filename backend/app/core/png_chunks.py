@@ -7,12 +7,30 @@ or re-encoded. All operations are binary append/replace on text chunks only.
 """
 
 import base64
+import re
 import struct
 import zlib
-from typing import Optional
+from typing import Collection, Iterable, Iterator, Optional
+
+try:
+    # Optional libdeflate bindings: hardware-accelerated CRC-32 (same polynomial as zlib)
+    from deflate import crc32 as _crc32  # type: ignore[import-not-found]
+except ImportError:
+    from zlib import crc32 as _crc32
 
 PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
 
+_LENGTH = struct.Struct(">I")
+_TEXT_CHUNK_TYPES = frozenset({"tEXt", "iTXt", "zTXt"})
+# Raw-type form for walks over file bytes, where types are never decoded
+_TEXT_CHUNK_TYPE_BYTES = frozenset({b"tEXt", b"iTXt", b"zTXt"})
+# Card payload keywords in priority order
+_CARD_KEYWORDS = ("ccv3", "chara")
+# Pre-encoded "keyword\0" prefixes for the keywords written on every export
+_KEYWORD_PREFIXES = {keyword: keyword.encode("latin-1") + b"\x00" for keyword in _CARD_KEYWORDS}
+# Base64 alphabet plus line breaks some encoders insert
+_BASE64_PREFIX = re.compile(rb"[A-Za-z0-9+/=\r\n]*")
+
 
 class PngChunkError(Exception):
     """Base exception for PNG chunk operations."""
@@ -26,16 +44,12 @@ class InvalidPngError(PngChunkError):
     pass
 
 
-def read_png_chunks(data: bytes) -> list[tuple[str, bytes]]:
-    """Read all PNG chunks from binary data.
+def _iter_chunk_spans(data: bytes, pos: int = 8) -> Iterator[tuple[bytes, int, int]]:
+    """Iterate PNG chunks as (raw_chunk_type, start_offset, data_length).
 
-    Stops parsing at IEND chunk, ignoring any garbage data after it.
-
-    Args:
-        data: Raw PNG file bytes
-
-    Returns:
-        List of (chunk_type, chunk_data) tuples
+    Chunk types are the raw 4-byte values, compared as bytes. A chunk occupies data[start : start + 12 + data_length]. Stops at IEND
+    or at the first truncated chunk. pos may point at any chunk boundary
+    to resume a walk part-way through the file.
 
     Raises:
         InvalidPngError: If data doesn't start with PNG signature
@@ -43,27 +57,51 @@ def read_png_chunks(data: bytes) -> list[tuple[str, bytes]]:
     if len(data) < 8 or data[:8] != PNG_SIGNATURE:
         raise InvalidPngError("Not a valid PNG file: invalid signature")
 
-    chunks: list[tuple[str, bytes]] = []
-    pos = 8
-
-    while pos < len(data):
-        if pos + 8 > len(data):
-            break
+    size = len(data)
 
-        length = struct.unpack(">I", data[pos : pos + 4])[0]
-        chunk_type = data[pos + 4 : pos + 8].decode("latin-1")
+    while pos + 8 <= size:
+        (length,) = _LENGTH.unpack_from(data, pos)
+        chunk_type = data[pos + 4 : pos + 8]
 
-        if pos + 12 + length > len(data):
+        if pos + 12 + length > size:
             break
 
-        chunk_data = data[pos + 8 : pos + 8 + length]
-        chunks.append((chunk_type, chunk_data))
+        yield chunk_type, pos, length
         pos += 12 + length
 
-        if chunk_type == "IEND":
+        if chunk_type == b"IEND":
             break
 
-    return chunks
+
+def _iter_chunk_views(data: bytes) -> Iterator[tuple[bytes, memoryview]]:
+    """Iterate PNG chunks as (raw_chunk_type, zero-copy memoryview slice of data).
+
+    Raises:
+        InvalidPngError: If data doesn't start with PNG signature
+    """
+    view = memoryview(data)
+    for chunk_type, start, length in _iter_chunk_spans(data):
+        yield chunk_type, view[start + 8 : start + 8 + length]
+
+
+def read_png_chunks(data: bytes) -> list[tuple[str, bytes]]:
+    """Read all PNG chunks from binary data.
+
+    Stops parsing at IEND chunk, ignoring any garbage data after it.
+
+    Args:
+        data: Raw PNG file bytes
+
+    Returns:
+        List of (chunk_type, chunk_data) tuples
+
+    Raises:
+        InvalidPngError: If data doesn't start with PNG signature
+    """
+    return [
+        (str(chunk_type, "latin-1"), view.tobytes())
+        for chunk_type, view in _iter_chunk_views(data)
+    ]
 
 
 def extract_idat_chunks(data: bytes) -> list[bytes]:
@@ -99,12 +137,15 @@ def _decode_text_chunk(chunk_data: bytes) -> tuple[str, str] | None:
     keyword = chunk_data[:null_pos].decode("latin-1")
     text_data = chunk_data[null_pos + 1 :]
 
-    try:
-        text = base64.b64decode(text_data).decode("utf-8")
-    except Exception:
-        text = text_data.decode("utf-8", errors="replace")
+    # Plain-text metadata (e.g. "Software", "Comment") fails the cheap prefix
+    # check and skips the base64 attempt and its exception
+    if _BASE64_PREFIX.fullmatch(text_data, 0, 64):
+        try:
+            return keyword, base64.b64decode(text_data).decode("utf-8")
+        except Exception:
+            pass
 
-    return keyword, text
+    return keyword, text_data.decode("utf-8", errors="replace")
 
 
 def _decode_itxt_chunk(chunk_data: bytes) -> tuple[str, str] | None:
@@ -186,32 +227,83 @@ def _decode_ztxt_chunk(chunk_data: bytes) -> tuple[str, str] | None:
     return keyword, text
 
 
-def read_text_chunks(data: bytes) -> dict[str, str] | None:
+def _chunk_keyword(chunk_data: bytes | memoryview) -> str | None:
+    """Peek the keyword of a text chunk (bytes before the first NUL) without decoding it."""
+    head = bytes(chunk_data[:80])  # PNG keywords are at most 79 bytes
+    null_pos = head.find(b"\x00")
+    if null_pos == -1:
+        return None
+    return head[:null_pos].decode("latin-1")
+
+
+def _collect_text_chunks(
+    chunks: Iterable[tuple[str, bytes]],
+    keywords: Optional[Collection[str]] = None,
+) -> list[tuple[str, bytes]]:
+    """Keep text chunks (optionally only the given keywords) from a parsed chunk list, undecoded."""
+    return [
+        (chunk_type, chunk_data)
+        for chunk_type, chunk_data in chunks
+        if chunk_type in _TEXT_CHUNK_TYPES
+        and (keywords is None or _chunk_keyword(chunk_data) in keywords)
+    ]
+
+
+def _scan_text_chunks(
+    data: bytes,
+    keywords: Optional[Collection[str]] = None,
+) -> list[tuple[str, bytes]]:
+    """Like _collect_text_chunks, but walks raw PNG bytes.
+
+    Only the text chunks that are kept are copied out and get a str type;
+    IDAT and other chunks are skipped on a bytes comparison.
+
+    Raises:
+        InvalidPngError: If data doesn't start with PNG signature
+    """
+    return [
+        (str(chunk_type, "latin-1"), chunk_data.tobytes())
+        for chunk_type, chunk_data in _iter_chunk_views(data)
+        if chunk_type in _TEXT_CHUNK_TYPE_BYTES
+        and (keywords is None or _chunk_keyword(chunk_data) in keywords)
+    ]
+
+
+def read_text_chunks(
+    data: bytes, keywords: Optional[Collection[str]] = None
+) -> dict[str, str] | None:
     """Read all text chunks (tEXt, iTXt, zTXt) from a PNG file.
 
     Args:
         data: Raw PNG file bytes
+        keywords: If given, only chunks with these keywords are decoded;
+            others are skipped before any base64/zlib work
 
     Returns:
         Dictionary mapping keywords to text content, or None/empty dict if no text chunks
     """
     try:
-        chunks = read_png_chunks(data)
+        # Only text chunks are copied out; IDAT payloads stay as views
+        chunks = _scan_text_chunks(data, keywords)
     except InvalidPngError:
         return None
 
-    result: dict[str, str] = {}
+    return decode_text_chunks(chunks)
 
-    for chunk_type, chunk_data in chunks:
-        decoded: tuple[str, str] | None = None
 
-        if chunk_type == "tEXt":
-            decoded = _decode_text_chunk(chunk_data)
-        elif chunk_type == "iTXt":
-            decoded = _decode_itxt_chunk(chunk_data)
-        elif chunk_type == "zTXt":
-            decoded = _decode_ztxt_chunk(chunk_data)
+def decode_text_chunks(chunks: list[tuple[str, bytes]]) -> dict[str, str] | None:
+    """Decode text chunks from an already parsed chunk list.
+
+    Args:
+        chunks: List of (chunk_type, chunk_data) tuples from read_png_chunks
+
+    Returns:
+        Dictionary mapping keywords to text content, or None if no text chunks
+    """
+    result: dict[str, str] = {}
 
+    for chunk_type, chunk_data in chunks:
+        decoded = _decode_any_text_chunk(chunk_type, chunk_data)
         if decoded:
             keyword, text = decoded
             result[keyword] = text
@@ -222,22 +314,32 @@ def read_text_chunks(data: bytes) -> dict[str, str] | None:
 def build_png(chunks: list[tuple[str, bytes]]) -> bytes:
     """Rebuild a PNG file from chunks.
 
+    The output buffer is sized up front and filled in place, so no
+    per-chunk temporaries are created.
+
     Args:
         chunks: List of (chunk_type, chunk_data) tuples
 
     Returns:
         Complete PNG file as bytes
     """
-    result = bytearray(PNG_SIGNATURE)
+    out = bytearray(len(PNG_SIGNATURE) + sum(12 + len(chunk_data) for _, chunk_data in chunks))
+    out[:8] = PNG_SIGNATURE
+    pos = 8
 
     for chunk_type, chunk_data in chunks:
-        length = struct.pack(">I", len(chunk_data))
         type_bytes = chunk_type.encode("latin-1")
-        crc = zlib.crc32(type_bytes + chunk_data) & 0xFFFFFFFF
-        crc_bytes = struct.pack(">I", crc)
-        result.extend(length + type_bytes + chunk_data + crc_bytes)
+        length = len(chunk_data)
+        end = pos + 8 + length
+        # CRC covers type + data; chain it so large IDAT data is never copied
+        crc = _crc32(chunk_data, _crc32(type_bytes))
+        _LENGTH.pack_into(out, pos, length)
+        out[pos + 4 : pos + 8] = type_bytes
+        out[pos + 8 : end] = chunk_data
+        _LENGTH.pack_into(out, end, crc)
+        pos = end + 4
 
-    return bytes(result)
+    return bytes(out)
 
 
 def _build_text_chunk_data(keyword: str, text: str) -> bytes:
@@ -252,8 +354,26 @@ def _build_text_chunk_data(keyword: str, text: str) -> bytes:
     Returns:
         Raw chunk data bytes
     """
-    encoded = base64.b64encode(text.encode("utf-8"))
-    return keyword.encode("latin-1") + b"\x00" + encoded
+    prefix = _KEYWORD_PREFIXES.get(keyword) or keyword.encode("latin-1") + b"\x00"
+    return prefix + base64.b64encode(text.encode("utf-8"))
+
+
+def _encode_chunk(chunk_type: str, chunk_data: bytes) -> bytes:
+    """Serialize a single chunk (length + type + data + CRC)."""
+    type_bytes = chunk_type.encode("latin-1")
+    crc = _crc32(chunk_data, _crc32(type_bytes))
+    return _LENGTH.pack(len(chunk_data)) + type_bytes + chunk_data + _LENGTH.pack(crc)
+
+
+def _decode_any_text_chunk(chunk_type: str, chunk_data: bytes) -> tuple[str, str] | None:
+    """Decode a tEXt/iTXt/zTXt chunk, or return None for other types."""
+    if chunk_type == "tEXt":
+        return _decode_text_chunk(chunk_data)
+    if chunk_type == "iTXt":
+        return _decode_itxt_chunk(chunk_data)
+    if chunk_type == "zTXt":
+        return _decode_ztxt_chunk(chunk_data)
+    return None
 
 
 def inject_text_chunk(
@@ -267,6 +387,9 @@ def inject_text_chunk(
     🚨 IDAT PROTECTION: This function only modifies text chunks.
     All other chunks (IHDR, IDAT, IEND, etc.) are preserved exactly.
 
+    The file is spliced rather than rebuilt: untouched chunks are copied
+    byte-for-byte with their original CRCs, so only the new chunk is hashed.
+
     Args:
         data: Raw PNG file bytes
         keyword: Chunk keyword (e.g., 'ccv3', 'chara')
@@ -279,8 +402,54 @@ def inject_text_chunk(
     Raises:
         InvalidPngError: If input is not a valid PNG
     """
-    chunks = read_png_chunks(data)
+    new_chunk = _encode_chunk("tEXt", _build_text_chunk_data(keyword, text))
+    view = memoryview(data)
+    parts: list[bytes | memoryview] = [PNG_SIGNATURE]
+    iend_index: Optional[int] = None
+    replaced = False
+
+    for chunk_type, start, length in _iter_chunk_spans(data):
+        if (
+            replace
+            and chunk_type == b"tEXt"
+            and _chunk_keyword(view[start + 8 : start + 8 + length]) == keyword
+        ):
+            parts.append(new_chunk)
+            replaced = True
+            continue
 
+        if chunk_type == b"IEND":
+            iend_index = len(parts)
+        parts.append(view[start : start + 12 + length])
+
+    if not replaced:
+        if iend_index is not None:
+            parts.insert(iend_index, new_chunk)
+        else:
+            parts.append(new_chunk)
+
+    return b"".join(parts)
+
+
+def set_text_chunk(
+    chunks: list[tuple[str, bytes]],
+    keyword: str,
+    text: str,
+    replace: bool = True,
+) -> list[tuple[str, bytes]]:
+    """Inject or replace a tEXt chunk in an already parsed chunk list.
+
+    Lets callers apply several text edits with a single parse/rebuild.
+
+    Args:
+        chunks: List of (chunk_type, chunk_data) tuples from read_png_chunks
+        keyword: Chunk keyword (e.g., 'ccv3', 'chara')
+        text: Text content to inject
+        replace: If True, replace existing chunk with same keyword
+
+    Returns:
+        New chunk list (input list is not modified)
+    """
     new_chunk_data = _build_text_chunk_data(keyword, text)
 
     new_chunks: list[tuple[str, bytes]] = []
@@ -308,12 +477,14 @@ def inject_text_chunk(
         else:
             new_chunks.append(("tEXt", new_chunk_data))
 
-    return build_png(new_chunks)
+    return new_chunks
 
 
 def remove_text_chunk(data: bytes, keyword: str) -> bytes:
     """Remove a text chunk with the specified keyword.
 
+    Like inject_text_chunk, remaining chunks are copied byte-for-byte.
+
     Args:
         data: Raw PNG file bytes
         keyword: Keyword of chunk to remove
@@ -321,30 +492,62 @@ def remove_text_chunk(data: bytes, keyword: str) -> bytes:
     Returns:
         Modified PNG file as bytes
     """
-    chunks = read_png_chunks(data)
-    new_chunks: list[tuple[str, bytes]] = []
+    view = memoryview(data)
+    parts: list[bytes | memoryview] = [PNG_SIGNATURE]
 
-    for chunk_type, chunk_data in chunks:
-        if chunk_type in ("tEXt", "iTXt", "zTXt"):
-            decoded: tuple[str, str] | None = None
-            if chunk_type == "tEXt":
-                decoded = _decode_text_chunk(chunk_data)
-            elif chunk_type == "iTXt":
-                decoded = _decode_itxt_chunk(chunk_data)
-            elif chunk_type == "zTXt":
-                decoded = _decode_ztxt_chunk(chunk_data)
+    for chunk_type, start, length in _iter_chunk_spans(data):
+        if (
+            chunk_type in _TEXT_CHUNK_TYPE_BYTES
+            and _chunk_keyword(view[start + 8 : start + 8 + length]) == keyword
+        ):
+            continue
 
-            if decoded and decoded[0] == keyword:
-                continue
+        parts.append(view[start : start + 12 + length])
 
-        new_chunks.append((chunk_type, chunk_data))
+    return b"".join(parts)
+
+
+def _fast_find_text_chunk(data: bytes, keyword: str) -> Optional[bytes]:
+    """Locate the last tEXt chunk for keyword with a byte search instead of a chunk walk.
+
+    Card writers put text chunks right before IEND, so rfind usually lands
+    near the end of the file. The hit is only trusted if its length and CRC
+    check out and the chunks after it run cleanly to IEND without another
+    text chunk for the same keyword (which would win in a full parse).
+
+    Returns:
+        The tEXt chunk data (keyword included), or None to fall back to a walk
+    """
+    if not data.startswith(PNG_SIGNATURE):
+        return None
+    idx = data.rfind(b"tEXt" + keyword.encode("latin-1") + b"\x00")
+    if idx < 12:
+        return None
+
+    (length,) = _LENGTH.unpack_from(data, idx - 4)
+    end = idx + 4 + length
+    if end + 4 > len(data) or _LENGTH.unpack_from(data, end)[0] != _crc32(data[idx:end]):
+        return None
 
-    return build_png(new_chunks)
+    try:
+        for chunk_type, start, tail_length in _iter_chunk_spans(data, end + 4):
+            if chunk_type == b"IEND":
+                return data[idx + 4 : end]
+            if chunk_type in _TEXT_CHUNK_TYPE_BYTES and _chunk_keyword(
+                data[start + 8 : start + 8 + tail_length]
+            ) == keyword:
+                return None
+    except InvalidPngError:
+        pass
+    return None
 
 
 def get_card_data(data: bytes) -> tuple[str, str] | None:
     """Extract character card data from PNG, preferring ccv3 over chara.
 
+    Tries a direct byte search for the card's tEXt chunk first and only
+    walks the whole chunk list when that search is inconclusive.
+
     Args:
         data: Raw PNG file bytes
 
@@ -352,14 +555,51 @@ def get_card_data(data: bytes) -> tuple[str, str] | None:
         Tuple of (format_type, json_string) where format_type is 'ccv3' or 'chara',
         or None if no card data found
     """
-    chunks = read_text_chunks(data)
-    if not chunks:
+    for keyword in _CARD_KEYWORDS:
+        # chara only counts when no ccv3 chunk exists anywhere in the file
+        if keyword == "chara" and b"ccv3" in data:
+            break
+        chunk_data = _fast_find_text_chunk(data, keyword)
+        if chunk_data is not None:
+            decoded = _decode_text_chunk(chunk_data)
+            if decoded:
+                return (keyword, decoded[1])
+            break
+
+    try:
+        chunks = _scan_text_chunks(data, _CARD_KEYWORDS)
+    except InvalidPngError:
         return None
+    return _select_card_chunk(chunks)
+
+
+def get_card_data_from_chunks(chunks: list[tuple[str, bytes]]) -> tuple[str, str] | None:
+    """Extract character card data from an already parsed chunk list.
 
-    if "ccv3" in chunks:
-        return ("ccv3", chunks["ccv3"])
+    Args:
+        chunks: List of (chunk_type, chunk_data) tuples from read_png_chunks
+
+    Returns:
+        Tuple of (format_type, json_string), or None if no card data found
+    """
+    return _select_card_chunk(_collect_text_chunks(chunks, _CARD_KEYWORDS))
 
-    if "chara" in chunks:
-        return ("chara", chunks["chara"])
+
+def _select_card_chunk(chunks: list[tuple[str, bytes]]) -> tuple[str, str] | None:
+    """Pick the card payload from undecoded card chunks, ccv3 first.
+
+    chara chunks are only decoded when no ccv3 chunk decodes. As with
+    decode_text_chunks, the last chunk for a keyword wins.
+    """
+    for wanted in _CARD_KEYWORDS:
+        text: str | None = None
+        for chunk_type, chunk_data in chunks:
+            if _chunk_keyword(chunk_data) != wanted:
+                continue
+            decoded = _decode_any_text_chunk(chunk_type, chunk_data)
+            if decoded:
+                text = decoded[1]
+        if text is not None:
+            return (wanted, text)
 
     return None
@@ -5,16 +5,29 @@ Provides HTTP client functionality for fetching character data from QuackAI.
 Handles Cookie parsing, User-Agent, and error classification.
 """
 
-import json
+import asyncio
+import hashlib
 import re
-from typing import Any, Dict, List, Optional, Tuple
+import time
+from collections import OrderedDict
+from itertools import chain
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union, cast
 from urllib.parse import urlparse
 
 import httpx
+import orjson
 
 from ..settings import get_settings
 from .exceptions import NetworkError, RateLimitedError, TimeoutError, UnauthorizedError
 
+try:
+    # Optional HTTP/2 support: info + lorebook fetches multiplex over one connection
+    import h2  # type: ignore[import-not-found]  # noqa: F401
+
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
 
 # Common User-Agent for Quack requests
 DEFAULT_USER_AGENT = (
@@ -22,6 +35,28 @@ DEFAULT_USER_AGENT = (
     "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 )
 
+# Pools replaced after an event-loop change; strong refs until their close finishes
+_closing_tasks: "Set[asyncio.Task[None]]" = set()
+
+
+async def _aclose_quietly(client: httpx.AsyncClient) -> None:
+    """Close a stale pool, ignoring errors (its original loop may be gone)."""
+    try:
+        await client.aclose()
+    except Exception:
+        pass
+
+
+# Headers for a default client without cookies; shared, never mutated
+_STATIC_HEADERS = {
+    "User-Agent": DEFAULT_USER_AGENT,
+    "Accept": "application/json",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+# Upper bound for JSON cookie exports (EditThisCookie); real ones are a few KB
+_MAX_COOKIE_JSON_CHARS = 1_000_000
+
 
 class CookieParser:
     """
@@ -47,12 +82,17 @@ class CookieParser:
         if not cookie_input:
             return {}
         
+        # Dispatch on the first character; non-empty after strip
+        first = cookie_input[0]
+        
         # Try JSON format first (array of cookie objects)
-        if cookie_input.startswith("["):
+        if first == "[":
             return CookieParser._parse_json(cookie_input)
         
-        # Try Netscape format (tab-separated, starts with domain or comment)
-        if "\t" in cookie_input or cookie_input.startswith("#"):
+        # Try Netscape format (tab-separated, starts with domain or comment).
+        # The tab scan stops at the first tab, which a cookies.txt has on its
+        # first data line; only tab-free header strings are scanned in full.
+        if first == "#" or "\t" in cookie_input:
             return CookieParser._parse_netscape(cookie_input)
         
         # Fall back to header string format (key=value; key2=value2)
@@ -61,8 +101,11 @@ class CookieParser:
     @staticmethod
     def _parse_json(cookie_input: str) -> Dict[str, str]:
         """Parse JSON format cookies (EditThisCookie export)."""
+        if len(cookie_input) > _MAX_COOKIE_JSON_CHARS:
+            return {}
+        
         try:
-            cookies = json.loads(cookie_input)
+            cookies = orjson.loads(cookie_input)
             if not isinstance(cookies, list):
                 return {}
             
@@ -74,27 +117,26 @@ class CookieParser:
                     if name:
                         result[name] = value
             return result
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             return {}
 
     @staticmethod
     def _parse_netscape(cookie_input: str) -> Dict[str, str]:
         """Parse Netscape format cookies (cookies.txt)."""
         result = {}
-        lines = cookie_input.strip().split("\n")
         
-        for line in lines:
+        # splitlines() also drops the "\r" of CRLF exports
+        for line in cookie_input.splitlines():
             line = line.strip()
             # Skip comments and empty lines
-            if not line or line.startswith("#"):
+            if not line or line[0] == "#":
                 continue
             
             # Netscape format: domain  flag  path  secure  expiration  name  value
-            parts = line.split("\t")
+            # At most 7 splits: columns after the value are never looked at
+            parts = line.split("\t", 7)
             if len(parts) >= 7:
-                name = parts[5]
-                value = parts[6]
-                result[name] = value
+                result[parts[5]] = parts[6]
         
         return result
 
@@ -103,28 +145,30 @@ class CookieParser:
         """Parse header string format (key=value; key2=value2)."""
         result = {}
         
-        # Remove "Cookie: " prefix if present
-        if cookie_input.lower().startswith("cookie:"):
-            cookie_input = cookie_input[7:].strip()
+        # Remove "Cookie: " prefix if present (lower-case only the prefix)
+        if cookie_input[:7].lower() == "cookie:":
+            cookie_input = cookie_input[7:]
         
-        # Split by semicolon
-        pairs = cookie_input.split(";")
-        for pair in pairs:
-            pair = pair.strip()
-            if "=" in pair:
-                # Only split on first '=' to handle values with '='
-                idx = pair.index("=")
-                name = pair[:idx].strip()
-                value = pair[idx + 1:].strip()
+        for pair in cookie_input.split(";"):
+            # partition splits on the first '=' only, so values may contain '='
+            name, sep, value = pair.partition("=")
+            if sep:
+                name = name.strip()
                 if name:
-                    result[name] = value
+                    result[name] = value.strip()
         
         return result
 
     @staticmethod
     def to_header_string(cookies: Dict[str, str]) -> str:
         """Convert cookie dict to header string format."""
-        return "; ".join(f"{k}={v}" for k, v in cookies.items())
+        # A list lets join() size its output in one pass; a generator is
+        # materialized into a list internally first anyway
+        return "; ".join([f"{k}={v}" for k, v in cookies.items()])
+
+
+# Direct character ID or SID (numeric or alphanumeric)
+_QUACK_ID_RE = re.compile(r"[a-zA-Z0-9_-]+")
 
 
 def extract_quack_id(input_str: str) -> Optional[str]:
@@ -145,8 +189,18 @@ def extract_quack_id(input_str: str) -> Optional[str]:
     if not input_str:
         return None
     
-    # Try to parse as URL
-    if "quack" in input_str.lower() or input_str.startswith("http"):
+    # Plain numeric ID, the most common input. isascii() keeps out Unicode
+    # digits such as "²" that str.isdigit() would otherwise accept.
+    if input_str.isascii() and input_str.isdigit():
+        return input_str
+
+    # Direct ID (alphanumeric SID). Checked before URL parsing: urlparse would
+    # return such a string unchanged as its only path segment anyway.
+    if _QUACK_ID_RE.fullmatch(input_str):
+        return input_str
+    
+    # Try to parse as URL (cheap prefix test first; lower() only if needed)
+    if input_str.startswith("http") or "quack" in input_str.lower():
         try:
             parsed = urlparse(input_str)
             path_parts = parsed.path.strip("/").split("/")
@@ -162,13 +216,25 @@ def extract_quack_id(input_str: str) -> Optional[str]:
         except Exception:
             pass
     
-    # Check if it's a direct ID (numeric or alphanumeric SID)
-    if re.match(r"^[a-zA-Z0-9_-]+$", input_str):
-        return input_str
-    
     return None
 
 
+# Response cache shared across QuackClient instances (one is created per request).
+# Key: (kind, character_id, cookie digest) -> (stored_at, etag, raw body)
+_CacheKey = Tuple[str, str, str]
+_RESPONSE_CACHE_MAXSIZE = 256
+_response_cache: "OrderedDict[_CacheKey, Tuple[float, Optional[str], bytes]]" = OrderedDict()
+
+
+# Keep-alive pool for the info + lorebook requests of one import/preview
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20, keepalive_expiry=30)
+
+
+def clear_response_cache() -> None:
+    """Drop all cached Quack responses."""
+    _response_cache.clear()
+
+
 class QuackClient:
     """
     Async HTTP client for QuackAI API.
@@ -195,30 +261,85 @@ class QuackClient:
             timeout: Request timeout in seconds (default from settings)
         """
         settings = get_settings()
-        self.cookies = cookies or {}
         self.user_agent = user_agent
         self.timeout = timeout or settings.http_timeout
+        # Endpoint URLs and cache TTL are resolved once, not on every fetch
+        self._info_url = f"{settings.quack_base_url}{settings.quack_character_info_path}"
+        self._lorebook_url = f"{settings.quack_base_url}{settings.quack_lorebook_path}"
+        self._cache_ttl = settings.quack_cache_ttl_seconds
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.set_cookies(cookies or {})
 
-    def _get_headers(self) -> Dict[str, str]:
-        """Build request headers."""
-        headers = {
-            "User-Agent": self.user_agent,
-            "Accept": "application/json",
-            "Accept-Language": "en-US,en;q=0.9",
-        }
-        
-        if self.cookies:
-            headers["Cookie"] = CookieParser.to_header_string(self.cookies)
+    def set_cookies(self, cookies: Dict[str, str]) -> None:
+        """
+        Replace the authentication cookies.
         
-        return headers
+        Request headers and the cookie digest used in cache keys are built
+        here once rather than on every request.
+        """
+        self.cookies = cookies
+        cookie_header = CookieParser.to_header_string(cookies)
+        if cookies or self.user_agent != DEFAULT_USER_AGENT:
+            headers = {**_STATIC_HEADERS, "User-Agent": self.user_agent}
+            if cookies:
+                headers["Cookie"] = cookie_header
+        else:
+            headers = _STATIC_HEADERS
+        self._headers = headers
+        self._cookie_digest = hashlib.blake2b(cookie_header.encode(), digest_size=16).hexdigest()
+        if self._http_client is not None:
+            self._http_client.headers = headers
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Return the shared httpx client, creating it on first use.
 
-    def _classify_error(self, status_code: int, response_body: str) -> None:
+        Reusing one client lets info + lorebook fetches share a keep-alive
+        connection instead of each opening a new TCP/TLS session. Pooled
+        connections are bound to the event loop that opened them, so a new
+        client is created if the instance is used from a different loop and
+        the old one is closed in the background.
+        """
+        loop = asyncio.get_running_loop()
+        if self._http_client is None or self._http_client_loop is not loop:
+            if self._http_client is not None:
+                task = loop.create_task(_aclose_quietly(self._http_client))
+                _closing_tasks.add(task)
+                task.add_done_callback(_closing_tasks.discard)
+            self._http_client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=_HTTP_LIMITS,
+                headers=self._headers,
+                http2=_HTTP2,
+            )
+            self._http_client_loop = loop
+        return self._http_client
+
+    async def aclose(self) -> None:
+        """Close the underlying connection pool."""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+            self._http_client_loop = None
+
+    async def __aenter__(self) -> "QuackClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    def _get_headers(self) -> Dict[str, str]:
+        """Return the request headers built by set_cookies (do not mutate)."""
+        return self._headers
+
+    def _classify_error(self, status_code: int, response_body: Union[str, bytes]) -> None:
         """
         Classify HTTP error and raise appropriate exception.
         
         Args:
             status_code: HTTP status code
-            response_body: Response body for additional context
+            response_body: Response body for additional context; raw bytes are
+                only decoded (first 500 bytes) when the body is reported
         """
         if status_code == 401:
             raise UnauthorizedError("Cookie Invalid - Please provide valid authentication cookies")
@@ -241,11 +362,140 @@ class QuackClient:
             )
         
         if status_code >= 400:
+            body = response_body[:500]
+            if isinstance(body, bytes):
+                body = body.decode("utf-8", errors="replace")
             raise NetworkError(
                 f"Quack API request failed (HTTP {status_code})",
-                details={"status_code": status_code, "body": response_body[:500]}
+                details={"status_code": status_code, "body": body}
             )
 
+    def _cache_key(self, kind: str, character_id: str) -> _CacheKey:
+        """Build a response cache key; cookies are stored only as a digest."""
+        return (kind, character_id, self._cookie_digest)
+
+    def _cache_lookup(self, key: _CacheKey) -> Tuple[Optional[bytes], Dict[str, str]]:
+        """Check the response cache.
+
+        Returns:
+            (body, extra_headers): body is the raw response body of a fresh
+            entry; otherwise extra_headers carries If-None-Match for a stale one.
+        """
+        entry = _response_cache.get(key)
+        if entry is None:
+            return None, {}
+
+        stored_at, etag, body = entry
+        if time.monotonic() - stored_at < self._cache_ttl:
+            _response_cache.move_to_end(key)
+            return body, {}
+
+        return None, ({"If-None-Match": etag} if etag else {})
+
+    def _cache_revalidated(self, key: _CacheKey) -> bytes:
+        """Handle a 304: refresh the entry's timestamp and return its body."""
+        _, etag, body = _response_cache[key]
+        _response_cache[key] = (time.monotonic(), etag, body)
+        _response_cache.move_to_end(key)
+        return body
+
+    def _cache_store(self, key: _CacheKey, etag: Optional[str], body: bytes) -> None:
+        """Store the raw body of a successful response."""
+        _response_cache[key] = (time.monotonic(), etag, body)
+        _response_cache.move_to_end(key)
+        if len(_response_cache) > _RESPONSE_CACHE_MAXSIZE:
+            _response_cache.popitem(last=False)
+
+    async def _fetch_cached(
+        self,
+        url: str,
+        character_id: str,
+        cache_key: _CacheKey,
+        parse: Callable[[bytes], Any],
+    ) -> Any:
+        """GET url for character_id, consulting the response cache first.
+
+        The cache holds raw bodies (only ones that parsed successfully), and
+        every hit is parsed again, so callers get objects they may mutate.
+
+        Returns:
+            parse(body) of the cached or fetched response body
+        """
+        body, extra_headers = self._cache_lookup(cache_key)
+        if body is not None:
+            return parse(body)
+
+        client = self._get_http_client()
+        try:
+            response = await client.get(
+                url,
+                params={"id": character_id},
+                headers=extra_headers or None,
+            )
+
+            if response.status_code == 304 and extra_headers:
+                return parse(self._cache_revalidated(cache_key))
+            
+            if response.status_code != 200:
+                self._classify_error(response.status_code, response.content)
+            
+            body = response.content
+            result = parse(body)
+            self._cache_store(cache_key, response.headers.get("etag"), body)
+            return result
+            
+        except httpx.TimeoutException:
+            raise TimeoutError("Quack API request timed out")
+        except httpx.RequestError as e:
+            raise NetworkError(f"Network error: {str(e)}")
+        except orjson.JSONDecodeError:
+            raise NetworkError("Quack API returned invalid JSON")
+
+    @staticmethod
+    def _parse_character_info(body: bytes) -> Dict[str, Any]:
+        """Parse a character info response body, raising on API-level errors."""
+        data = orjson.loads(body)
+        
+        # Check for API-level errors
+        if isinstance(data, dict):
+            code = data.get("code")
+            if code is not None and code != 0:
+                msg = data.get("message", data.get("msg", "Unknown error"))
+                if code == 401 or "auth" in str(msg).lower():
+                    raise UnauthorizedError(f"Cookie Invalid - {msg}")
+                raise NetworkError(f"Quack API error: {msg}", details={"code": code})
+
+        return cast(Dict[str, Any], data)
+
+    @staticmethod
+    def _parse_lorebook(body: bytes) -> List[Dict[str, Any]]:
+        """Parse a world book response body into a flat list of entries."""
+        data = orjson.loads(body)
+        
+        # Extract entries from response
+        if isinstance(data, dict):
+            code = data.get("code")
+            if code is not None and code != 0:
+                msg = data.get("message", data.get("msg", "Unknown error"))
+                raise NetworkError(f"Quack API error: {msg}", details={"code": code})
+
+            # Quack lorebook format: {"code": 0, "data": [...]}
+            entries = data.get("data", [])
+            if isinstance(entries, list):
+                # Flatten books ({"entryList": [...]}) and bare entries in order;
+                # JSON objects are always exact dicts, so no isinstance walk
+                result: List[Dict[str, Any]] = list(chain.from_iterable(
+                    (item["entryList"] or ()) if "entryList" in item else (item,)
+                    for item in entries
+                    if type(item) is dict
+                ))
+            else:
+                result = []
+        else:
+            result = data if isinstance(data, list) else []
+
+        return result
+
     async def fetch_character_info(self, character_id: str) -> Dict[str, Any]:
         """
         Fetch character info from Quack API.
@@ -262,38 +512,13 @@ class QuackClient:
             NetworkError: Other network errors
             TimeoutError: Request timeout
         """
-        settings = get_settings()
-        url = f"{settings.quack_base_url}{settings.quack_character_info_path}"
-        params = {"id": character_id}
-        
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.get(
-                    url,
-                    params=params,
-                    headers=self._get_headers(),
-                )
-                
-                if response.status_code != 200:
-                    self._classify_error(response.status_code, response.text)
-                
-                data = response.json()
-                
-                # Check for API-level errors
-                if isinstance(data, dict):
-                    code = data.get("code")
-                    if code is not None and code != 0:
-                        msg = data.get("message", data.get("msg", "Unknown error"))
-                        if code == 401 or "auth" in str(msg).lower():
-                            raise UnauthorizedError(f"Cookie Invalid - {msg}")
-                        raise NetworkError(f"Quack API error: {msg}", details={"code": code})
-                
-                return data
-                
-            except httpx.TimeoutException:
-                raise TimeoutError("Quack API request timed out")
-            except httpx.RequestError as e:
-                raise NetworkError(f"Network error: {str(e)}")
+        result = await self._fetch_cached(
+            self._info_url,
+            character_id,
+            self._cache_key("info", character_id),
+            self._parse_character_info,
+        )
+        return cast(Dict[str, Any], result)
 
     async def fetch_lorebook(self, character_id: str) -> List[Dict[str, Any]]:
         """
@@ -305,49 +530,13 @@ class QuackClient:
         Returns:
             List of world book entries
         """
-        settings = get_settings()
-        url = f"{settings.quack_base_url}{settings.quack_lorebook_path}"
-        params = {"id": character_id}
-        
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.get(
-                    url,
-                    params=params,
-                    headers=self._get_headers(),
-                )
-                
-                if response.status_code != 200:
-                    self._classify_error(response.status_code, response.text)
-                
-                data = response.json()
-                
-                # Extract entries from response
-                if isinstance(data, dict):
-                    code = data.get("code")
-                    if code is not None and code != 0:
-                        msg = data.get("message", data.get("msg", "Unknown error"))
-                        raise NetworkError(f"Quack API error: {msg}", details={"code": code})
-                    
-                    # Quack lorebook format: {"code": 0, "data": [...]}
-                    entries = data.get("data", [])
-                    if isinstance(entries, list):
-                        # Flatten if nested structure
-                        result = []
-                        for item in entries:
-                            if isinstance(item, dict) and "entryList" in item:
-                                result.extend(item.get("entryList", []))
-                            elif isinstance(item, dict):
-                                result.append(item)
-                        return result
-                    return []
-                
-                return data if isinstance(data, list) else []
-                
-            except httpx.TimeoutException:
-                raise TimeoutError("Quack API request timed out")
-            except httpx.RequestError as e:
-                raise NetworkError(f"Network error: {str(e)}")
+        result = await self._fetch_cached(
+            self._lorebook_url,
+            character_id,
+            self._cache_key("lorebook", character_id),
+            self._parse_lorebook,
+        )
+        return cast(List[Dict[str, Any]], result)
 
     async def fetch_character_complete(
         self, character_id: str
@@ -361,12 +550,17 @@ class QuackClient:
         Returns:
             Tuple of (character_info, lorebook_entries)
         """
-        info = await self.fetch_character_info(character_id)
+        # Both requests are independent; run them concurrently
+        info, lorebook = await asyncio.gather(
+            self.fetch_character_info(character_id),
+            self.fetch_lorebook(character_id),
+            return_exceptions=True,
+        )
+        if isinstance(info, BaseException):
+            raise info
         
-        # Try to fetch lorebook (may be empty or fail)
-        try:
-            lorebook = await self.fetch_lorebook(character_id)
-        except Exception:
+        # Lorebook may be empty or fail
+        if isinstance(lorebook, BaseException):
             lorebook = []
         
         return info, lorebook
@@ -376,5 +570,6 @@ __all__ = [
     "CookieParser",
     "QuackClient",
     "extract_quack_id",
+    "clear_response_cache",
     "DEFAULT_USER_AGENT",
 ]
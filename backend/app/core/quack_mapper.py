@@ -65,6 +65,30 @@ def extract_personality(attrs: List[Dict[str, Any]]) -> str:
     return ""
 
 
+def _scan_attrs(attrs: List[Dict[str, Any]]) -> tuple[str, str]:
+    """
+    Single pass over attrs producing format_attrs(attrs) and extract_personality(attrs).
+    
+    Returns:
+        Tuple of (formatted visible attrs, personality value)
+    """
+    lines = []
+    personality = None
+    for attr in attrs:
+        get = attr.get
+        label = get("label", "")
+        value = get("value", "")
+        
+        # Like extract_personality: first match wins, visible or not
+        if personality is None and label.lower() == "personality":
+            personality = value
+        
+        if label and value and get("isVisible", True):
+            lines.append(f"[{label}: {value}]")
+    
+    return "\n".join(lines), personality or ""
+
+
 def extract_greetings(quack_info: Dict[str, Any]) -> tuple[str, List[str]]:
     """
     Extract first_mes and alternate_greetings from Quack data.
@@ -82,34 +106,33 @@ def extract_greetings(quack_info: Dict[str, Any]) -> tuple[str, List[str]]:
     Returns:
         Tuple of (first_mes, alternate_greetings)
     """
-    # Check if alternate_greetings is already provided
-    alt_greetings = quack_info.get("alternate_greetings", [])
     first_mes = quack_info.get("firstMes", "")
     
-    if alt_greetings and isinstance(alt_greetings, list):
+    # Check if alternate_greetings is already provided (decoded JSON: exact list type)
+    alt_greetings = quack_info.get("alternate_greetings")
+    if alt_greetings and type(alt_greetings) is list:
         # Use firstMes as the main greeting, alternate_greetings as alternatives
         return first_mes, alt_greetings
     
     # Extract from prologue.greetings
-    prologue = quack_info.get("prologue", {}) or {}
-    prologue_greetings = prologue.get("greetings", []) or []
+    prologue = quack_info.get("prologue")
+    prologue_greetings = prologue.get("greetings") if prologue else None
     
-    if prologue_greetings and isinstance(prologue_greetings, list):
-        greetings_values = []
+    if prologue_greetings and type(prologue_greetings) is list:
+        greetings_values: List[str] = []
+        append = greetings_values.append
         for g in prologue_greetings:
-            if isinstance(g, dict):
+            if type(g) is dict:
                 # Preserve HTML exactly as-is
-                greetings_values.append(g.get("value", ""))
+                append(g.get("value", ""))
             elif isinstance(g, str):
-                greetings_values.append(g)
+                append(g)
         
         if greetings_values:
             # First greeting becomes first_mes, rest become alternates
             if not first_mes:
-                first_mes = greetings_values[0]
-                return first_mes, greetings_values[1:]
-            else:
-                return first_mes, greetings_values
+                return greetings_values[0], greetings_values[1:]
+            return first_mes, greetings_values
     
     return first_mes, []
 
@@ -157,8 +180,10 @@ def map_lorebook_entry(entry: Dict[str, Any], index: int) -> LorebookEntry:
     Returns:
         LorebookEntry model
     """
+    get = entry.get
+    
     # Extract keys (may be 'keywords' or 'triggerKeywords')
-    keys = entry.get("keywords", entry.get("triggerKeywords", []))
+    keys = get("keywords") if "keywords" in entry else get("triggerKeywords", [])
     if not isinstance(keys, list):
         keys = [keys] if keys else []
     
@@ -166,55 +191,54 @@ def map_lorebook_entry(entry: Dict[str, Any], index: int) -> LorebookEntry:
     keys = [str(k) for k in keys if k is not None]
     
     # Check constant flag
-    constant = entry.get("constant", False)
+    constant = get("constant", False)
+    name = get("name", "")
     
     # HARD CONSTRAINT: If keys are empty and NOT constant, fall back to name
-    if not keys and not constant:
-        name = entry.get("name", "")
-        if name:
-            keys = [name]
+    if not keys and not constant and name:
+        keys = [name]
     
     # HARD CONSTRAINT: constant=true entries can have empty keys - DO NOT DROP
     
     # Extract secondary keys
-    secondary_keys = entry.get("secondaryKeys", entry.get("secondary_keys", []))
+    if "secondaryKeys" in entry:
+        secondary_keys = get("secondaryKeys")
+    else:
+        secondary_keys = get("secondary_keys", [])
     if not isinstance(secondary_keys, list):
         secondary_keys = [secondary_keys] if secondary_keys else []
     secondary_keys = [str(k) for k in secondary_keys if k is not None]
     
-    # HARD CONSTRAINT: selective is True ONLY when secondary_keys exist
-    selective = len(secondary_keys) > 0
-    
-    # Map position (0 = before_char, 1 = after_char)
-    position_val = entry.get("position", 0)
-    position = "after_char" if position_val == 1 else "before_char"
-    
     # Build extensions with Quack-specific metadata
     extensions = {}
     if "matchWholeWords" in entry:
-        extensions["match_whole_words"] = entry.get("matchWholeWords", False)
+        extensions["match_whole_words"] = entry["matchWholeWords"]
     if "scanDepth" in entry:
-        extensions["scan_depth"] = entry.get("scanDepth", 50)
-    if entry.get("depth"):
-        extensions["depth"] = entry.get("depth")
-    if entry.get("role"):
-        extensions["role"] = entry.get("role")
+        extensions["scan_depth"] = entry["scanDepth"]
+    depth = get("depth")
+    if depth:
+        extensions["depth"] = depth
+    role = get("role")
+    if role:
+        extensions["role"] = role
     
     return LorebookEntry(
         keys=keys,
-        content=entry.get("content", ""),
+        content=get("content", ""),
         extensions=extensions,
-        enabled=entry.get("enabled", True),
+        enabled=get("enabled", True),
         insertion_order=index + 1,
         case_sensitive=False,
         use_regex=False,
         constant=constant,
-        name=entry.get("name", ""),
+        name=name,
         priority=10,
         id=index + 1,
-        selective=selective,
+        # HARD CONSTRAINT: selective is True ONLY when secondary_keys exist
+        selective=len(secondary_keys) > 0,
         secondary_keys=secondary_keys,
-        position=position,
+        # Map position (0 = before_char, 1 = after_char)
+        position="after_char" if get("position", 0) == 1 else "before_char",
     )
 
 
@@ -229,9 +253,8 @@ def map_lorebook(entries: List[Dict[str, Any]], book_name: str = "Quack Lore") -
     Returns:
         Lorebook model
     """
-    mapped_entries = [
-        map_lorebook_entry(entry, i) for i, entry in enumerate(entries)
-    ]
+    map_entry = map_lorebook_entry
+    mapped_entries = [map_entry(entry, i) for i, entry in enumerate(entries)]
     
     return Lorebook(
         name=book_name,
@@ -277,18 +300,15 @@ def map_quack_to_v3(
     custom_attrs = char.get("customAttrs", []) or []
     all_attrs = attrs + advise_attrs + custom_attrs
     
-    # Build description: intro + formatted attrs
+    # Build description: intro + formatted attrs; personality comes from the same pass
     intro = quack_info.get("intro", char.get("intro", ""))
-    attr_block = format_attrs(all_attrs, visible_only=True)
+    attr_block, personality = _scan_attrs(all_attrs)
     
     if attr_block:
         description = f"{intro}\n\n{attr_block}" if intro else attr_block
     else:
         description = intro
     
-    # Extract personality from attrs
-    personality = extract_personality(all_attrs)
-    
     # Extract greetings (HTML preserved exactly)
     first_mes, alternate_greetings = extract_greetings(quack_info)
     
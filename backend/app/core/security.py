@@ -7,7 +7,8 @@
 import ipaddress
 import re
 import socket
-from typing import List, Optional
+from functools import lru_cache
+from typing import FrozenSet, List, Optional, Tuple
 from urllib.parse import urlparse
 
 from app.settings import get_settings
@@ -39,8 +40,20 @@ class PrivateIPError(SecurityError):
 
 
 CGNAT_NETWORK = ipaddress.ip_network("100.64.0.0/10")
+_LINK_LOCAL_NETWORK = ipaddress.ip_network("169.254.0.0/16")
 
+_LOCALHOST_NAMES = frozenset({
+    "localhost",
+    "localhost.localdomain",
+    "127.0.0.1",
+    "::1",
+    "[::1]",
+})
+_LOCALHOST_SUFFIX_RE = re.compile(r"^localhost\.\w+$")
 
+
+# 两个检查都是纯函数，而代理请求反复校验同一批主机名/IP，结果按输入缓存
+@lru_cache(maxsize=2048)
 def is_private_ip(ip_str: str) -> bool:
     """检查 IP 是否为私网/内网地址。
     
@@ -73,7 +86,7 @@ def is_private_ip(ip_str: str) -> bool:
             return True
         
         if isinstance(ip, ipaddress.IPv4Address):
-            if ip in ipaddress.ip_network("169.254.0.0/16"):
+            if ip in _LINK_LOCAL_NETWORK:
                 return True
             if ip in CGNAT_NETWORK:
                 return True
@@ -83,24 +96,18 @@ def is_private_ip(ip_str: str) -> bool:
         return True
 
 
+@lru_cache(maxsize=2048)
 def is_localhost(hostname: str) -> bool:
     """检查主机名是否为 localhost 变体。"""
-    localhost_patterns = [
-        "localhost",
-        "localhost.localdomain",
-        "127.0.0.1",
-        "::1",
-        "[::1]",
-    ]
     hostname_lower = hostname.lower()
     
-    if hostname_lower in localhost_patterns:
+    if hostname_lower in _LOCALHOST_NAMES:
         return True
     
     if hostname_lower.startswith("127."):
         return True
     
-    if re.match(r"^localhost\.\w+$", hostname_lower):
+    if _LOCALHOST_SUFFIX_RE.match(hostname_lower):
         return True
     
     return False
@@ -138,6 +145,7 @@ def validate_url_security(url: str, allow_localhost: Optional[bool] = None) -> N
         allow_localhost = settings.proxy_allow_localhost
     
     parsed = urlparse(url)
+    # urlparse 返回的 hostname 已是小写，后续检查无需再次转换
     hostname = parsed.hostname or ""
     
     if not hostname:
@@ -148,15 +156,31 @@ def validate_url_security(url: str, allow_localhost: Optional[bool] = None) -> N
             return
         raise URLBlockedError(url, "localhost access not allowed")
     
-    if is_hostname_in_allowlist(hostname, settings.proxy_url_allowlist):
-        ips = resolve_hostname(hostname)
-        for ip in ips:
-            if is_private_ip(ip):
-                if not (allow_localhost and is_localhost(hostname)):
-                    raise PrivateIPError(ip)
-        return
+    # 先做白名单检查（纯内存），仅对放行的主机发起 DNS 解析
+    domains = _compile_allowlist(settings.proxy_url_allowlist_tuple)
+    if not _in_allowed_domains(hostname, domains):
+        raise URLBlockedError(url, f"Host '{hostname}' not in allowlist")
     
-    raise URLBlockedError(url, f"Host '{hostname}' not in allowlist")
+    # 到这里主机名一定不是 localhost，任何私网解析结果都直接拒绝
+    for ip in resolve_hostname(hostname):
+        if is_private_ip(ip):
+            raise PrivateIPError(ip)
+
+
+@lru_cache(maxsize=32)
+def _compile_allowlist(allowlist: Tuple[str, ...]) -> FrozenSet[str]:
+    """将白名单预处理为小写域名集合。
+    
+    "*.example.com" 与 "example.com" 都匹配该域名本身及其所有子域名，
+    因此两种写法归一为同一个域名。
+    """
+    domains = set()
+    for pattern in allowlist:
+        pattern_lower = pattern.lower()
+        if pattern_lower.startswith("*."):
+            pattern_lower = pattern_lower[2:]
+        domains.add(pattern_lower)
+    return frozenset(domains)
 
 
 def is_hostname_in_allowlist(hostname: str, allowlist: List[str]) -> bool:
@@ -166,22 +190,38 @@ def is_hostname_in_allowlist(hostname: str, allowlist: List[str]) -> bool:
     - 精确匹配: "api.openai.com"
     - 子域名匹配: "*.openai.com" 匹配 "api.openai.com"
     """
-    hostname_lower = hostname.lower()
-    
-    for pattern in allowlist:
-        pattern_lower = pattern.lower()
-        
-        if pattern_lower.startswith("*."):
-            suffix = pattern_lower[1:]
-            if hostname_lower.endswith(suffix) or hostname_lower == pattern_lower[2:]:
-                return True
-        else:
-            if hostname_lower == pattern_lower:
-                return True
-            if hostname_lower.endswith("." + pattern_lower):
-                return True
-    
-    return False
+    return _in_allowed_domains(hostname.lower(), _compile_allowlist(tuple(allowlist)))
+
+
+def _in_allowed_domains(hostname_lower: str, domains: FrozenSet[str]) -> bool:
+    """检查已小写的主机名或其任一父域名是否在预处理后的白名单集合内。"""
+    # 依次检查主机名本身及其每个父域名："a.b.com" -> "b.com" -> "com"
+    while True:
+        if hostname_lower in domains:
+            return True
+        dot = hostname_lower.find(".")
+        if dot == -1:
+            return False
+        hostname_lower = hostname_lower[dot + 1:]
+
+
+# 脱敏规则（模块加载时编译一次），每条附带命中时文本中必然出现的小写标记。
+# 按顺序逐条替换：前一条的结果是后一条的输入，
+# 例如 "Authorization: Bearer <token>" 需先由 bearer 规则脱敏 token，
+# 合并为单个交替正则会让 authorization 规则先吞掉 "Bearer" 而漏掉 token。
+# 替换只会删去标记、不会产生新标记，因此用原文判断即可。
+_REDACT_RULES = [
+    ("sk-", re.compile(r'(sk-)[a-zA-Z0-9]{20,}'), r'\1[REDACTED]'),
+    ("api", re.compile(r'(api[-_]?key["\'\s:=]+)[a-zA-Z0-9\-_]{20,}', re.IGNORECASE), r'\1[REDACTED]'),
+    ("bearer", re.compile(r'(bearer\s+)[a-zA-Z0-9\-_.]+', re.IGNORECASE), r'\1[REDACTED]'),
+    ("authorization", re.compile(r'(authorization["\'\s:=]+)[^\s"\']+', re.IGNORECASE), r'\1[REDACTED]'),
+    ("cookie", re.compile(r'(cookie["\'\s:=]+)[^\s"\']+', re.IGNORECASE), r'\1[REDACTED]'),
+    ("x-api-key", re.compile(r'(x-api-key["\'\s:=]+)[a-zA-Z0-9\-_.]+', re.IGNORECASE), r'\1[REDACTED]'),
+]
+
+# IGNORECASE 下还能匹配上述标记字母的非 ASCII 字符（"İ"、"ı"、开尔文符号 "K"），
+# 先折叠为 ASCII，使 lower() 后的标记检查与正则保持一致
+_IGNORECASE_FOLD = (("\u0130", "i"), ("\u0131", "i"), ("\u212a", "k"))
 
 
 def redact_sensitive_data(text: str) -> str:
@@ -192,23 +232,18 @@ def redact_sensitive_data(text: str) -> str:
     - Bearer Token
     - Cookie 值
     """
-    patterns = [
-        (r'(sk-)[a-zA-Z0-9]{20,}', r'\1[REDACTED]'),
-        (r'(api[-_]?key["\'\s:=]+)[a-zA-Z0-9\-_]{20,}', r'\1[REDACTED]', re.IGNORECASE),
-        (r'(bearer\s+)[a-zA-Z0-9\-_.]+', r'\1[REDACTED]', re.IGNORECASE),
-        (r'(authorization["\'\s:=]+)[^\s"\']+', r'\1[REDACTED]', re.IGNORECASE),
-        (r'(cookie["\'\s:=]+)[^\s"\']+', r'\1[REDACTED]', re.IGNORECASE),
-        (r'(x-api-key["\'\s:=]+)[a-zA-Z0-9\-_.]+', r'\1[REDACTED]', re.IGNORECASE),
-    ]
+    folded = text
+    if not text.isascii():
+        for char, ascii_char in _IGNORECASE_FOLD:
+            if char in folded:
+                folded = folded.replace(char, ascii_char)
+    lowered = folded.lower()
     
+    # 只运行标记出现过的规则；大多数日志行一条都不运行
     result = text
-    for pattern_tuple in patterns:
-        if len(pattern_tuple) == 3:
-            pattern, replacement, flags = pattern_tuple
-            result = re.sub(pattern, replacement, result, flags=flags)
-        else:
-            pattern, replacement = pattern_tuple
-            result = re.sub(pattern, replacement, result)
+    for marker, pattern, replacement in _REDACT_RULES:
+        if marker in lowered:
+            result = pattern.sub(replacement, result)
     
     return result
 
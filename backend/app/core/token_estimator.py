@@ -5,6 +5,7 @@ Formula: Chinese characters / 0.7 + Non-Chinese characters / 4
 """
 
 import re
+from functools import lru_cache
 from typing import Any, Dict, List, Optional
 
 from .card_models import CharacterCardV3, Lorebook
@@ -22,6 +23,15 @@ CJK_PATTERN = re.compile(
     r"]"
 )
 
+# Runs of consecutive CJK characters. Written as "X X*" rather than "X+" so the
+# regex engine keeps its fast charset scan for the first character.
+_CJK_RUN_PATTERN = re.compile(CJK_PATTERN.pattern + CJK_PATTERN.pattern + "*")
+
+
+# Strings longer than this are estimated directly rather than kept in the LRU.
+# Together with the LRU size this caps the cache at ~32M characters.
+_TOKEN_CACHE_MAX_TEXT_LEN = 16_384
+
 
 def estimate_tokens(text: str) -> int:
     """Estimate token count for a text string.
@@ -30,6 +40,9 @@ def estimate_tokens(text: str) -> int:
     - CJK characters (Chinese/Japanese/Korean): count / 0.7
     - Other characters: count / 4
 
+    Results are memoized per string, so fields left unchanged between
+    edits are not rescanned.
+
     Args:
         text: Input text
 
@@ -38,9 +51,18 @@ def estimate_tokens(text: str) -> int:
     """
     if not text:
         return 0
+    if len(text) > _TOKEN_CACHE_MAX_TEXT_LEN:
+        return _estimate_tokens_uncached(text)
+    return _estimate_tokens_cached(text)
 
-    cjk_chars = CJK_PATTERN.findall(text)
-    cjk_count = len(cjk_chars)
+
+def _estimate_tokens_uncached(text: str) -> int:
+    """Compute the token estimate for a non-empty string."""
+    if text.isascii():
+        cjk_count = 0
+    else:
+        # One match per run instead of one list item per CJK character
+        cjk_count = sum(map(len, _CJK_RUN_PATTERN.findall(text)))
 
     non_cjk_count = len(text) - cjk_count
 
@@ -50,6 +72,9 @@ def estimate_tokens(text: str) -> int:
     return int(cjk_tokens + non_cjk_tokens)
 
 
+_estimate_tokens_cached = lru_cache(maxsize=2048)(_estimate_tokens_uncached)
+
+
 def estimate_lorebook_tokens(lorebook: Optional[Lorebook]) -> Dict[str, int]:
     """Estimate tokens for lorebook/world book.
 
@@ -111,11 +136,11 @@ def estimate_card_tokens(card: CharacterCardV3) -> Dict[str, int]:
             breakdown[field_name] = estimate_tokens(value)
 
     if data.alternate_greetings:
-        alt_total = sum(estimate_tokens(g) for g in data.alternate_greetings)
+        alt_total = sum(map(estimate_tokens, data.alternate_greetings))
         breakdown["alternate_greetings"] = alt_total
 
     if data.group_only_greetings:
-        group_total = sum(estimate_tokens(g) for g in data.group_only_greetings)
+        group_total = sum(map(estimate_tokens, data.group_only_greetings))
         breakdown["group_only_greetings"] = group_total
 
     if data.character_book:
@@ -13,6 +13,10 @@ from .card_models import (
     LorebookEntry,
 )
 
+# Keys mapped explicitly below; anything else is carried over as a model extra
+_LOREBOOK_ENTRY_FIELDS = frozenset(LorebookEntry.model_fields)
+_LOREBOOK_FIELDS = frozenset(Lorebook.model_fields) | {"entries"}
+
 
 def migrate_lorebook(v2_book: Optional[Dict[str, Any]]) -> Optional[Lorebook]:
     """Migrate V2 character_book to V3 Lorebook format.
@@ -47,10 +51,10 @@ def migrate_lorebook(v2_book: Optional[Dict[str, Any]]) -> Optional[Lorebook]:
                 selective=entry.get("selective"),
                 secondary_keys=entry.get("secondary_keys", []),
                 position=entry.get("position"),
+                # Extras go through the constructor (extra="allow") rather
+                # than one validated __setattr__ per key afterwards
+                **{k: v for k, v in entry.items() if k not in _LOREBOOK_ENTRY_FIELDS},
             )
-            for k, v in entry.items():
-                if k not in LorebookEntry.model_fields:
-                    setattr(lore_entry, k, v)
             entries.append(lore_entry)
 
     lorebook = Lorebook(
@@ -61,12 +65,9 @@ def migrate_lorebook(v2_book: Optional[Dict[str, Any]]) -> Optional[Lorebook]:
         recursive_scanning=v2_book.get("recursive_scanning"),
         extensions=v2_book.get("extensions", {}),
         entries=entries,
+        **{k: v for k, v in v2_book.items() if k not in _LOREBOOK_FIELDS},
     )
 
-    for k, v in v2_book.items():
-        if k not in Lorebook.model_fields and k != "entries":
-            setattr(lorebook, k, v)
-
     return lorebook
 
 
@@ -102,36 +103,18 @@ def migrate_v2_to_v3(v2_data: Dict[str, Any]) -> CharacterCardV3:
             if isinstance(a, dict)
         ]
 
-    data = CharacterCardData(
-        name=source.get("name", ""),
-        description=source.get("description", ""),
-        tags=source.get("tags", []),
-        creator=source.get("creator", ""),
-        character_version=source.get("character_version", ""),
-        mes_example=source.get("mes_example", ""),
-        extensions=source.get("extensions", {}),
-        system_prompt=source.get("system_prompt", ""),
-        post_history_instructions=source.get("post_history_instructions", ""),
-        first_mes=source.get("first_mes", ""),
-        alternate_greetings=source.get("alternate_greetings", []),
-        personality=source.get("personality", ""),
-        scenario=source.get("scenario", ""),
-        creator_notes=source.get("creator_notes", ""),
-        character_book=character_book,
-        assets=assets,
-        nickname=source.get("nickname"),
-        creator_notes_multilingual=source.get("creator_notes_multilingual"),
-        source=source.get("source"),
-        group_only_greetings=source.get("group_only_greetings", []),
-        creation_date=source.get("creation_date"),
-        modification_date=source.get("modification_date"),
+    # V2 field names match V3, so the source validates as-is: absent fields
+    # take the model defaults and unknown keys become extras (extra="allow").
+    # Only the nested book/assets are swapped for their migrated models.
+    data = CharacterCardData.model_validate(
+        {
+            "name": "",
+            **source,
+            "character_book": character_book,
+            "assets": assets,
+        }
     )
 
-    known_fields = set(CharacterCardData.model_fields.keys()) | {"character_book", "assets"}
-    for k, v in source.items():
-        if k not in known_fields:
-            setattr(data, k, v)
-
     return CharacterCardV3(
         spec="chara_card_v3",
         spec_version="3.0",
@@ -1,12 +1,15 @@
 """CardForge API - Main FastAPI application."""
 
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.responses import Response
+from starlette.types import Scope
 
 from app.settings import get_settings
 from app.api import health
@@ -20,12 +23,21 @@ from app.middleware.rate_limit import RateLimitMiddleware, get_proxy_rate_limite
 
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application lifespan: release pooled upstream connections on shutdown."""
+    yield
+    await proxy.close_clients()
+
+
 app = FastAPI(
     title=settings.app_name,
     version=settings.app_version,
     description="Tavern Card Forge - Character card parsing, editing, and AI-assisted generation",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # Exception handlers
@@ -67,24 +79,27 @@ async def api_root():
     }
 
 
+class SPAStaticFiles(StaticFiles):
+    """Static files for the SPA frontend, with client-side routing fallback.
+
+    Existing files are served by StaticFiles (ETag / 304 handling, stat off
+    the event loop, no escaping the directory). Any other non-API path
+    returns index.html, so deep links like /cards/edit/123 reach the
+    frontend router; unknown /api/ paths stay 404.
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        try:
+            return await super().get_response(path, scope)
+        except StarletteHTTPException as exc:
+            if exc.status_code != 404 or path == "api" or path.startswith("api/"):
+                raise
+            return await super().get_response("index.html", scope)
+
+
 # Mount static files (frontend build) if available
-# This is used in production Docker deployment
+# This is used in production Docker deployment. Mounted last, so API routes
+# always take precedence.
 static_dir = Path(__file__).parent.parent / "static"
 if static_dir.exists() and static_dir.is_dir():
-    @app.get("/{full_path:path}")
-    async def spa_fallback(full_path: str):
-        """SPA fallback route - serves index.html for all non-API routes.
-        
-        This enables client-side routing in the SPA frontend.
-        Deep links like /cards/edit/123 will return index.html,
-        allowing the frontend router to handle the path.
-        """
-        if full_path.startswith("api/"):
-            from fastapi import HTTPException
-            raise HTTPException(status_code=404, detail="Not found")
-        
-        static_file = static_dir / full_path
-        if static_file.exists() and static_file.is_file():
-            return FileResponse(static_file)
-        
-        return FileResponse(static_dir / "index.html")
+    app.mount("/", SPAStaticFiles(directory=static_dir, html=True), name="spa")
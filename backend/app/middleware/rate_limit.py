@@ -5,9 +5,9 @@
 """
 
 import time
-from collections import defaultdict
+from collections import OrderedDict, deque
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Deque, Optional
 
 from fastapi import Request, HTTPException
 from starlette.middleware.base import BaseHTTPMiddleware
@@ -25,10 +25,19 @@ class RateLimitConfig:
 class RateLimiter:
     """滑动窗口限流器"""
     
-    def __init__(self, requests: int = 10, window_seconds: int = 60):
+    def __init__(self, requests: int = 10, window_seconds: int = 60, max_keys: int = 100_000):
         self.requests = requests
         self.window_seconds = window_seconds
-        self._requests: Dict[str, List[float]] = defaultdict(list)
+        # 跟踪的键数上限：大量不同 IP 涌入时按最久未访问淘汰，内存有界
+        self.max_keys = max_keys
+        # 每个键的请求时间戳按追加顺序递增，最旧的在队首；键按最近访问排序
+        self._requests: "OrderedDict[str, Deque[float]]" = OrderedDict()
+    
+    def _evict(self, timestamps: Deque[float], now: float) -> None:
+        """从队首弹出窗口外的时间戳（均摊 O(1)）。"""
+        window_start = now - self.window_seconds
+        while timestamps and timestamps[0] <= window_start:
+            timestamps.popleft()
     
     def is_allowed(self, key: str) -> bool:
         """检查请求是否被允许。
@@ -40,46 +49,44 @@ class RateLimiter:
             True 如果允许，False 如果超限
         """
         now = time.time()
-        window_start = now - self.window_seconds
-        
-        self._requests[key] = [
-            ts for ts in self._requests[key] if ts > window_start
-        ]
-        
-        if len(self._requests[key]) >= self.requests:
+        timestamps = self._requests.get(key)
+        if timestamps is None:
+            # 只有这里会新增键
+            timestamps = self._requests[key] = deque()
+            if len(self._requests) > self.max_keys:
+                self._requests.popitem(last=False)
+        else:
+            self._requests.move_to_end(key)
+            self._evict(timestamps, now)
+        
+        if len(timestamps) >= self.requests:
             return False
         
-        self._requests[key].append(now)
+        timestamps.append(now)
         return True
     
     def get_remaining(self, key: str) -> int:
         """获取剩余可用请求数。"""
-        now = time.time()
-        window_start = now - self.window_seconds
-        
-        valid_requests = [
-            ts for ts in self._requests[key] if ts > window_start
-        ]
+        timestamps = self._requests.get(key)
+        if not timestamps:
+            return self.requests
         
-        return max(0, self.requests - len(valid_requests))
+        self._evict(timestamps, time.time())
+        return max(0, self.requests - len(timestamps))
     
     def get_reset_time(self, key: str) -> Optional[float]:
         """获取限流重置时间（秒）。"""
-        if not self._requests[key]:
+        timestamps = self._requests.get(key)
+        if not timestamps:
             return None
         
         now = time.time()
-        window_start = now - self.window_seconds
+        self._evict(timestamps, now)
         
-        valid_requests = [
-            ts for ts in self._requests[key] if ts > window_start
-        ]
-        
-        if not valid_requests:
+        if not timestamps:
             return None
         
-        oldest = min(valid_requests)
-        return self.window_seconds - (now - oldest)
+        return self.window_seconds - (now - timestamps[0])
     
     def cleanup(self) -> int:
         """清理过期的请求记录。
@@ -88,15 +95,12 @@ class RateLimiter:
             清理的键数量
         """
         now = time.time()
-        window_start = now - self.window_seconds
         
         keys_to_remove = []
         for key, timestamps in self._requests.items():
-            valid = [ts for ts in timestamps if ts > window_start]
-            if not valid:
+            self._evict(timestamps, now)
+            if not timestamps:
                 keys_to_remove.append(key)
-            else:
-                self._requests[key] = valid
         
         for key in keys_to_remove:
             del self._requests[key]
@@ -124,12 +128,12 @@ def get_client_ip(request: Request) -> str:
     
     仅在请求来自可信代理时信任代理头（X-Forwarded-For、X-Real-IP）。
     """
-    settings = get_settings()
-    trusted_proxies = set(settings.trusted_proxies)
+    trusted_proxies = get_settings().trusted_proxies_set
     
     direct_ip = request.client.host if request.client else "unknown"
     
-    if trusted_proxies and direct_ip in trusted_proxies:
+    # 未配置可信代理（大多数部署）时不读取任何代理头
+    if direct_ip in trusted_proxies:
         forwarded_for = request.headers.get("X-Forwarded-For")
         if forwarded_for:
             return forwarded_for.split(",")[0].strip()
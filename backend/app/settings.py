@@ -1,8 +1,8 @@
 """Application settings and configuration."""
 
 import os
-from functools import lru_cache
-from typing import List
+from functools import cached_property, lru_cache
+from typing import FrozenSet, List, Tuple
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -62,11 +62,22 @@ class Settings(BaseSettings):
     quack_base_url: str = "https://api.quack.ai"
     quack_character_info_path: str = "/character/info"
     quack_lorebook_path: str = "/character/book"
+    quack_cache_ttl_seconds: int = 60  # Fresh window before revalidating with ETag
     
     @property
     def max_upload_bytes(self) -> int:
         """Maximum upload size in bytes."""
         return self.max_upload_mb * 1024 * 1024
+    
+    @cached_property
+    def proxy_url_allowlist_tuple(self) -> Tuple[str, ...]:
+        """Proxy allowlist as a hashable tuple, built once per settings instance."""
+        return tuple(self.proxy_url_allowlist)
+    
+    @cached_property
+    def trusted_proxies_set(self) -> FrozenSet[str]:
+        """Trusted proxy IPs as a frozenset, built once per settings instance."""
+        return frozenset(self.trusted_proxies)
 
 
 @lru_cache
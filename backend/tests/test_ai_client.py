@@ -4,6 +4,10 @@ AI Client 模块测试
 测试 AIClient 的请求构建和响应解析。
 """
 
+import asyncio
+import json
+
+import httpx
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 
@@ -88,6 +92,22 @@ class TestChatRequest:
         assert "max_tokens" not in data
         assert "top_p" not in data
         assert "stop" not in data
+    
+    def test_to_dict_message_name_only_when_set(self):
+        """仅在设置 name 的消息上输出 name 字段"""
+        request = ChatRequest(
+            messages=[
+                Message(role="system", content="sys", name="System"),
+                Message(role="user", content="hi"),
+            ],
+            model="gpt-4",
+            stop=[],
+        )
+        data = request.to_dict()
+        
+        assert data["messages"][0] == {"role": "system", "content": "sys", "name": "System"}
+        assert data["messages"][1] == {"role": "user", "content": "hi"}
+        assert "stop" not in data
 
 
 class TestImageRequest:
@@ -133,6 +153,15 @@ class TestStreamChunk:
         )
         assert chunk.is_done is True
 
+    @pytest.mark.parametrize("cls", [
+        Message, ChatChoice, ChatResponse, StreamChunk, ModelInfo,
+        ModelsResponse, ImageData, ImageResponse,
+    ])
+    def test_response_types_are_slotted(self, cls):
+        """响应类型使用 __slots__，每个实例不带 __dict__"""
+        assert "__slots__" in vars(cls)
+        assert "__dict__" not in vars(cls)
+
 
 class TestAIClientParsing:
     """AI 客户端响应解析测试"""
@@ -252,3 +281,191 @@ class TestAIClientErrors:
         error = RateLimitedError()
         assert error.code == "RATE_LIMITED"
         assert error.status_code == 429
+
+
+class TestAIClientTransport:
+    """AI 客户端请求/响应传输测试（MockTransport，无真实网络）"""
+    
+    @staticmethod
+    def _make_client(handler):
+        with patch("app.core.ai_client.validate_url_security"):
+            client = AIClient(base_url="https://api.openai.com", api_key="test-key")
+        client._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        client._http_client_loop = asyncio.get_running_loop()
+        return client
+    
+    def test_http_client_rebound_per_event_loop(self):
+        """连接池绑定事件循环：换循环时新建连接池，旧连接池被关闭"""
+        with patch("app.core.ai_client.validate_url_security"):
+            client = AIClient(base_url="https://api.openai.com", api_key="test-key")
+        
+        async def get_client():
+            http_client = client._get_http_client()
+            await asyncio.sleep(0)
+            return http_client
+        
+        first = asyncio.run(get_client())
+        second = asyncio.run(get_client())
+        
+        assert first is not second
+        assert first.is_closed
+        assert not second.is_closed
+    
+    async def test_chat_roundtrip(self):
+        """请求体为 JSON，响应被正确解析"""
+        captured = {}
+        
+        def handler(request):
+            captured["body"] = json.loads(request.content)
+            captured["content_type"] = request.headers["content-type"]
+            return httpx.Response(200, json={
+                "id": "chatcmpl-1",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "你好"}}],
+            })
+        
+        client = self._make_client(handler)
+        response = await client.chat(ChatRequest(
+            messages=[Message(role="user", content="hi")],
+            model="gpt-4",
+        ))
+        await client.aclose()
+        
+        assert captured["content_type"] == "application/json"
+        assert captured["body"]["model"] == "gpt-4"
+        assert captured["body"]["stream"] is False
+        assert response.choices[0].message.content == "你好"
+    
+    async def test_chat_stream_parses_sse(self):
+        """流式响应按行解析并在 [DONE] 处结束"""
+        body = (
+            b'data: {"id":"c1","choices":[{"index":0,"delta":{"content":"He"}}]}\n\n'
+            b": keep-alive\n\n"
+            b"data: not-json\n\n"
+            b'data: {"id":"c1","choices":[{"index":0,"delta":{"content":"llo"},"finish_reason":"stop"}]}\n\n'
+            b"data: [DONE]\n\n"
+            b'data: {"id":"ignored","choices":[]}\n\n'
+        )
+        
+        def handler(request):
+            return httpx.Response(200, content=body, headers={"content-type": "text/event-stream"})
+        
+        client = self._make_client(handler)
+        chunks = [c async for c in client.chat_stream(ChatRequest(
+            messages=[Message(role="user", content="hi")],
+            model="gpt-4",
+        ))]
+        await client.aclose()
+        
+        assert [c.choices[0].delta["content"] for c in chunks] == ["He", "llo"]
+        assert chunks[-1].is_done is True
+    
+    async def test_chat_rate_limited(self):
+        """429 映射为 RateLimitedError"""
+        client = self._make_client(lambda request: httpx.Response(429))
+        with pytest.raises(RateLimitedError):
+            await client.chat(ChatRequest(messages=[], model="gpt-4"))
+        await client.aclose()
+    
+    async def test_chat_stream_size_limit(self):
+        """超过 max_response_size 的流被中止"""
+        body = b'data: {"id":"c1","choices":[{"index":0,"delta":{"content":"x"}}]}\n\n' * 50
+        
+        client = self._make_client(
+            lambda request: httpx.Response(200, stream=httpx.ByteStream(body))
+        )
+        client.max_response_size = 100
+        
+        with pytest.raises(UpstreamError):
+            async for _ in client.chat_stream(ChatRequest(messages=[], model="gpt-4")):
+                pass
+        await client.aclose()
+    
+    async def test_chat_stream_size_limit_without_newlines(self):
+        """没有换行的流同样按字节数中止，不会读完整个响应"""
+        sent = []
+        
+        class NoNewlineStream(httpx.AsyncByteStream):
+            async def __aiter__(self):
+                for _ in range(100):
+                    sent.append(50)
+                    yield b"x" * 50
+        
+        client = self._make_client(
+            lambda request: httpx.Response(200, stream=NoNewlineStream())
+        )
+        client.max_response_size = 100
+        
+        with pytest.raises(UpstreamError, match="too large"):
+            async for _ in client.chat_stream(ChatRequest(messages=[], model="gpt-4")):
+                pass
+        await client.aclose()
+        
+        assert sum(sent) <= 150
+    
+    async def test_chat_stream_crlf_and_trailing_line(self):
+        """支持 CRLF 行尾，末尾无换行的最后一行也会被解析"""
+        body = (
+            'data: {"id":"c1","choices":[{"index":0,"delta":{"content":"你"}}]}\r\n\r\n'
+            'data: {"id":"c1","choices":[{"index":0,"delta":{"content":"好"}}]}'
+        ).encode()
+        
+        client = self._make_client(
+            lambda request: httpx.Response(200, stream=httpx.ByteStream(body))
+        )
+        chunks = [c async for c in client.chat_stream(ChatRequest(messages=[], model="gpt-4"))]
+        await client.aclose()
+        
+        assert [c.choices[0].delta["content"] for c in chunks] == ["你", "好"]
+    
+    async def test_content_length_precheck(self):
+        """声明的 Content-Length 超限时直接拒绝"""
+        client = self._make_client(lambda request: httpx.Response(
+            200, json={"object": "list", "data": [{"id": "m" * 200}]}
+        ))
+        client.max_response_size = 100
+        
+        with pytest.raises(UpstreamError, match="too large"):
+            await client.list_models()
+        await client.aclose()
+    
+    async def test_body_size_limit_without_content_length(self):
+        """未声明长度的响应边读边计数"""
+        body = b'{"object": "list", "data": [' + b'{"id": "m"},' * 50 + b'{"id": "m"}]}'
+        
+        client = self._make_client(
+            lambda request: httpx.Response(200, stream=httpx.ByteStream(body))
+        )
+        client.max_response_size = 100
+        
+        with pytest.raises(UpstreamError, match="too large"):
+            await client.list_models()
+        await client.aclose()
+    
+    async def test_error_body_included(self):
+        """4xx/5xx 响应体写入 UpstreamError"""
+        client = self._make_client(lambda request: httpx.Response(500, text="boom"))
+        
+        with pytest.raises(UpstreamError, match="boom") as exc_info:
+            await client.generate_image(ImageRequest(prompt="cat"))
+        await client.aclose()
+        
+        assert exc_info.value.status_code == 500
+    
+    async def test_transport_errors_translated(self):
+        """httpx 超时/连接异常映射为 AIClientError 子类"""
+        def timeout(request):
+            raise httpx.ReadTimeout("slow", request=request)
+        
+        def dropped(request):
+            raise httpx.RemoteProtocolError("peer closed", request=request)
+        
+        client = self._make_client(timeout)
+        with pytest.raises(TimeoutError):
+            await client.list_models()
+        await client.aclose()
+        
+        client = self._make_client(dropped)
+        with pytest.raises(NetworkError):
+            async for _ in client.chat_stream(ChatRequest(messages=[], model="gpt-4")):
+                pass
+        await client.aclose()
@@ -2,11 +2,13 @@
 
 import json
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
 from fastapi.testclient import TestClient
 
 from app.main import app
+from app.settings import Settings
 
 
 @pytest.fixture
@@ -139,6 +141,18 @@ class TestInjectEndpoint:
 
         assert response.status_code == 400
 
+    def test_inject_invalid_structure_fails(self, client, golden_files_dir):
+        """Well-formed JSON that is not a V3 card returns 422."""
+        png_data = (golden_files_dir / "plain_image.png").read_bytes()
+
+        response = client.post(
+            "/api/cards/inject",
+            files={"file": ("test.png", png_data, "image/png")},
+            data={"card_v3_json": json.dumps({"spec": "chara_card_v3", "data": {}})},
+        )
+
+        assert response.status_code == 422
+
     def test_inject_sets_filename(self, client, golden_files_dir):
         """Response has content-disposition with filename."""
         png_data = (golden_files_dir / "plain_image.png").read_bytes()
@@ -160,6 +174,25 @@ class TestInjectEndpoint:
         assert ".png" in disposition
 
 
+    def test_inject_verification_failure_returns_500(self, client, golden_files_dir):
+        """A written chunk that does not match the card is an internal error."""
+        png_data = (golden_files_dir / "plain_image.png").read_bytes()
+        card_json = json.dumps({
+            "spec": "chara_card_v3",
+            "spec_version": "3.0",
+            "data": {"name": "TestName"},
+        })
+
+        with patch("app.core.card_export.verify_export_fast", return_value=False):
+            response = client.post(
+                "/api/cards/inject",
+                files={"file": ("test.png", png_data, "image/png")},
+                data={"card_v3_json": card_json},
+            )
+
+        assert response.status_code == 500
+        assert "verification failed" in response.json()["detail"]["error"]
+
 class TestValidateEndpoint:
     """Tests for POST /api/cards/validate."""
 
@@ -239,3 +272,60 @@ class TestValidateEndpoint:
         assert response.status_code == 200
         data = response.json()
         assert any("token" in w.lower() for w in data["data"]["warnings"] + data["data"]["errors"])
+
+    def test_validate_quick_skips_token_check(self, client):
+        """quick=true stops after cheap checks when they already failed."""
+        card = {
+            "spec": "chara_card_v3",
+            "spec_version": "3.0",
+            "data": {"name": "", "description": "A" * 60000},
+        }
+
+        full = client.post("/api/cards/validate", json=card).json()["data"]
+        quick = client.post("/api/cards/validate?quick=true", json=card).json()["data"]
+
+        assert full["valid"] is False and quick["valid"] is False
+        assert any("token" in e.lower() for e in full["errors"])
+        assert not any("token" in e.lower() for e in quick["errors"])
+
+    def test_validate_lorebook_warnings_aggregated(self, client):
+        """Lorebook issues are reported as one warning per kind."""
+        entries = [{"keys": [], "content": ""} for _ in range(15)]
+        response = client.post(
+            "/api/cards/validate",
+            json={
+                "spec": "chara_card_v3",
+                "spec_version": "3.0",
+                "data": {
+                    "name": "Test",
+                    "first_mes": "Hi",
+                    "description": "desc",
+                    "character_book": {"entries": entries},
+                },
+            },
+        )
+
+        assert response.status_code == 200
+        warnings = response.json()["data"]["warnings"]
+        lorebook_warnings = [w for w in warnings if "lorebook" in w.lower()]
+        assert len(lorebook_warnings) == 2
+        assert lorebook_warnings[0].startswith("15 lorebook entries have no keys")
+        assert "..." in lorebook_warnings[0]
+
+
+class TestUploadSizeLimit:
+    """Tests for upload size enforcement."""
+
+    def test_oversized_upload_rejected(self, client, golden_files_dir):
+        """Uploads above max_upload_mb return 413."""
+        png_data = (golden_files_dir / "v3_card.png").read_bytes()
+        padded = png_data + b"\x00" * (1024 * 1024)
+
+        with patch("app.api.cards.get_settings", return_value=Settings(max_upload_mb=1)):
+            response = client.post(
+                "/api/cards/parse",
+                files={"file": ("big.png", padded, "image/png")},
+            )
+
+        assert response.status_code == 413
+        assert response.json()["detail"]["error_code"] == "FILE_TOO_LARGE"
@@ -10,10 +10,11 @@ from app.core.card_export import (
     export_to_png,
     generate_export_filename,
     verify_export,
+    verify_export_fast,
 )
 from app.core.card_import import import_from_png
 from app.core.card_models import CharacterCardData, CharacterCardV3
-from app.core.png_chunks import extract_idat_chunks, get_card_data
+from app.core.png_chunks import extract_idat_chunks, get_card_data, read_png_chunks
 
 
 class TestExportToPng:
@@ -83,6 +84,54 @@ class TestExportToPng:
         assert "ccv3" in chunks
         assert "chara" not in chunks
 
+    def test_embedded_json_fields(self, minimal_png_bytes):
+        """ccv3 gets a fresh modification_date; chara drops V3-only fields."""
+        card = CharacterCardV3(
+            data=CharacterCardData(name="Test", nickname="T", modification_date=1)
+        )
+
+        result = export_to_png(minimal_png_bytes, card)
+
+        from app.core.png_chunks import read_text_chunks
+        chunks = read_text_chunks(result)
+        v3 = json.loads(chunks["ccv3"])
+        v2 = json.loads(chunks["chara"])
+        assert v3["data"]["nickname"] == "T"
+        assert v3["data"]["modification_date"] > 1
+        assert card.data.modification_date == 1
+        assert v2["name"] == "Test"
+        assert "nickname" not in v2
+        assert "modification_date" not in v2
+
+    def test_v2_chunk_keeps_extra_fields(self, minimal_png_bytes):
+        """Unknown data fields survive into chara; only V3-only fields are dropped."""
+        card = CharacterCardV3.model_validate({
+            "spec": "chara_card_v3",
+            "data": {"name": "Test", "custom_field": {"k": 1}, "source": ["x"]},
+        })
+
+        result = export_to_png(minimal_png_bytes, card)
+
+        from app.core.png_chunks import read_text_chunks
+        v2 = json.loads(read_text_chunks(result)["chara"])
+        assert v2["custom_field"] == {"k": 1}
+        assert "source" not in v2
+
+    def test_extra_integer_beyond_64_bits(self, minimal_png_bytes):
+        """Integers orjson cannot serialize are written exactly via the json fallback."""
+        big = 2**70
+        card = CharacterCardV3.model_validate({
+            "spec": "chara_card_v3",
+            "data": {"name": "Big", "big": big},
+        })
+
+        result = export_to_png(minimal_png_bytes, card, verify=True)
+
+        from app.core.png_chunks import read_text_chunks
+        chunks = read_text_chunks(result)
+        assert json.loads(chunks["ccv3"])["data"]["big"] == big
+        assert json.loads(chunks["chara"])["big"] == big
+
     def test_base64_no_newlines(self, minimal_png_bytes):
         """Base64 encoded data has no newlines."""
         card = CharacterCardV3(
@@ -122,6 +171,56 @@ class TestVerifyExport:
         assert ok is True
         assert error is None
 
+    def test_verify_strict(self, minimal_png_bytes):
+        """Strict mode passes on a faithful export and reports the first differing path."""
+        card = CharacterCardV3(
+            data=CharacterCardData(name="Strict", tags=["a", "b"])
+        )
+
+        result = export_to_png(minimal_png_bytes, card)
+        assert verify_export(result, card, strict=True) == (True, None)
+
+        other = card.model_copy(update={"data": card.data.model_copy(update={"tags": ["a", "c"]})})
+        ok, error = verify_export(result, other, strict=True)
+        assert ok is False
+        assert error == "Value mismatch at .data.tags[1]: c vs b"
+
+    def test_verify_non_strict_ignores_extras(self, minimal_png_bytes):
+        """Cards with extra fields verify in both modes; key fields are still compared."""
+        card = CharacterCardV3.model_validate({
+            "spec": "chara_card_v3",
+            "spec_version": "3.0",
+            "data": {"name": "Extras", "first_mes": "Hi", "custom": {"a": 1}},
+        })
+        result = export_to_png(minimal_png_bytes, card)
+
+        assert verify_export(result, card) == (True, None)
+        assert verify_export(result, card, strict=True) == (True, None)
+
+        renamed = card.model_copy(update={"data": card.data.model_copy(update={"name": "Other"})})
+        assert verify_export(result, renamed) == (False, "Name mismatch: 'Other' vs 'Extras'")
+
+    def test_verify_fast(self, minimal_png_bytes):
+        """Fast verify compares the ccv3 chunk to the written JSON string."""
+        card = CharacterCardV3(data=CharacterCardData(name="Fast"))
+
+        result = export_to_png(minimal_png_bytes, card, verify=True)
+        _, v3_json = get_card_data(result)
+
+        assert verify_export_fast(result, v3_json) is True
+        assert verify_export_fast(result, v3_json.replace("Fast", "Slow")) is False
+        assert verify_export_fast(minimal_png_bytes, v3_json) is False
+
+    def test_export_verify_failure_raises(self, minimal_png_bytes, monkeypatch):
+        """export_to_png(verify=True) raises when the written chunk does not match."""
+        from app.core import card_export
+
+        monkeypatch.setattr(card_export, "verify_export_fast", lambda png, expected: False)
+        card = CharacterCardV3(data=CharacterCardData(name="Broken"))
+
+        with pytest.raises(CardExportError, match="verification failed"):
+            export_to_png(minimal_png_bytes, card, verify=True)
+
     def test_verify_fails_on_corrupted(self, minimal_png_bytes):
         """Verification fails on corrupted export."""
         card = CharacterCardV3(
@@ -134,6 +233,26 @@ class TestVerifyExport:
         assert ok is False
         assert error is not None
 
+    def test_export_splices_image_chunks(self, minimal_png_bytes):
+        """Image chunks are spliced byte-for-byte, original CRCs included."""
+        card = CharacterCardV3(
+            data=CharacterCardData(name="Chunks", first_mes="Hi", description="desc")
+        )
+
+        result = export_to_png(minimal_png_bytes, card)
+
+        assert minimal_png_bytes[8:57] in result
+        assert [t for t, _ in read_png_chunks(result)] == ["IHDR", "IDAT", "tEXt", "tEXt", "IEND"]
+        assert verify_export(result, card) == (True, None)
+
+    def test_verify_without_card_data(self, minimal_png_bytes):
+        """A PNG with no card payload fails verification."""
+        card = CharacterCardV3(data=CharacterCardData(name="Test"))
+        ok, error = verify_export(minimal_png_bytes, card)
+
+        assert ok is False
+        assert "no character card data" in error
+
 
 class TestGenerateExportFilename:
     """Tests for filename generation."""
@@ -159,6 +278,15 @@ class TestGenerateExportFilename:
         assert ">" not in filename
         assert ":" not in filename
 
+    def test_keeps_unicode_alphanumerics(self):
+        """Non-ASCII letters and digits are kept; other characters become underscores."""
+        card = CharacterCardV3(
+            data=CharacterCardData(name=" 艾莉丝-Ⅱ_x/y\tz²! ")
+        )
+
+        filename = generate_export_filename(card)
+        assert filename.startswith("艾莉丝-Ⅱ_x_y_z²_")
+
     def test_truncates_long_names(self):
         """Long names are truncated."""
         card = CharacterCardV3(
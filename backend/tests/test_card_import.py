@@ -1,13 +1,17 @@
 """Tests for card_import module."""
 
+import base64
 import json
+from io import BytesIO
 
 import pytest
+from PIL import Image
 
 from app.core.card_import import (
     CardImportError,
     detect_file_type,
     import_card,
+    import_from_image,
     import_from_json,
     import_from_png,
 )
@@ -93,6 +97,13 @@ class TestImportFromJson:
 
         assert "Invalid JSON" in str(exc_info.value)
 
+    def test_raises_on_invalid_utf8_bytes(self):
+        """Bytes that are not valid UTF-8 raise CardImportError."""
+        with pytest.raises(CardImportError) as exc_info:
+            import_from_json(b'{"name": "\xff"}')
+
+        assert "Invalid JSON" in str(exc_info.value)
+
     def test_raises_on_missing_fields(self):
         """Missing required fields raises error."""
         with pytest.raises(CardImportError):
@@ -158,6 +169,30 @@ class TestImportFromPng:
         assert "Invalid PNG" in str(exc_info.value) or "no character card" in str(exc_info.value).lower()
 
 
+class TestImportFromImage:
+    """Tests for non-PNG image conversion."""
+
+    def test_converts_gif_to_png(self):
+        """Palette images become lossless RGBA PNGs."""
+        src = Image.new("P", (4, 3))
+        src.putpalette([255, 0, 0] * 256)
+        buf = BytesIO()
+        src.save(buf, format="GIF")
+
+        png_data = import_from_image(buf.getvalue())
+
+        with Image.open(BytesIO(png_data)) as img:
+            assert img.format == "PNG"
+            assert img.mode == "RGBA"
+            assert img.size == (4, 3)
+            assert img.getpixel((0, 0)) == (255, 0, 0, 255)
+
+    def test_raises_on_garbage(self):
+        """Undecodable data raises CardImportError."""
+        with pytest.raises(CardImportError):
+            import_from_image(b"GIF89a not really")
+
+
 class TestImportCard:
     """Tests for unified import function."""
 
@@ -176,3 +211,27 @@ class TestImportCard:
 
         assert has_image is False
         assert card.data.name == "TestChar"
+
+    def test_reads_card_from_jpeg_comment(self, v3_standard_json):
+        """Card JSON in a JPEG comment is read without converting to PNG."""
+        from unittest.mock import patch
+
+        comment = base64.b64encode(json.dumps(v3_standard_json).encode())
+        buf = BytesIO()
+        Image.new("RGB", (8, 8)).save(buf, format="JPEG", comment=comment)
+
+        with patch("app.core.card_import.import_from_image") as mock_convert:
+            card, fmt, has_image = import_card(buf.getvalue())
+
+        mock_convert.assert_not_called()
+        assert card.data.name == "TestChar"
+        assert fmt == "v3"
+        assert has_image is True
+
+    def test_image_without_card_still_raises(self):
+        """Images with unrelated comments fall back to conversion and fail cleanly."""
+        buf = BytesIO()
+        Image.new("RGB", (8, 8)).save(buf, format="JPEG", comment=b"made with paint")
+
+        with pytest.raises(CardImportError, match="no card data"):
+            import_card(buf.getvalue())
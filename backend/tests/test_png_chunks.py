@@ -142,3 +142,121 @@ class TestPngChunks:
         chunks = read_text_chunks(png_data)
 
         assert chunks is None or chunks == {}, "Plain image should have no text chunks"
+
+    def test_build_png_roundtrip_is_byte_identical(self, golden_files_dir: Path):
+        """重建未修改的 chunk 列表必须与原文件逐字节一致 (CRC 正确)"""
+        from app.core.png_chunks import build_png, read_png_chunks
+
+        original_data = (golden_files_dir / "v3_card.png").read_bytes()
+        rebuilt = build_png(read_png_chunks(original_data))
+
+        assert rebuilt == original_data
+
+    def test_text_chunks_match_full_parse(self, golden_files_dir: Path):
+        """只拷贝文本 chunk 的快速路径与完整解析结果一致，且 chunk 数据为 bytes"""
+        from app.core.png_chunks import decode_text_chunks, read_png_chunks, read_text_chunks
+
+        for name in ("v3_card.png", "dual_chunk.png", "garbage_after_iend.png"):
+            png_data = (golden_files_dir / name).read_bytes()
+            chunks = read_png_chunks(png_data)
+
+            assert all(type(chunk_data) is bytes for _, chunk_data in chunks)
+            assert read_text_chunks(png_data) == decode_text_chunks(chunks)
+
+    def test_crc32_backend_matches_zlib(self):
+        """可选的 CRC 加速实现必须与 zlib.crc32 (含链式初值) 逐位一致"""
+        import zlib
+
+        from app.core.png_chunks import _crc32
+
+        payload = bytes(range(256)) * 64
+        assert _crc32(payload) == zlib.crc32(payload)
+        assert _crc32(payload, _crc32(b"IDAT")) == zlib.crc32(b"IDAT" + payload)
+
+    def test_inject_and_remove_match_rebuild(self, golden_files_dir: Path):
+        """拼接式注入/删除与完整解析重建的结果逐字节一致"""
+        from app.core.png_chunks import (
+            build_png,
+            inject_text_chunk,
+            read_png_chunks,
+            read_text_chunks,
+            remove_text_chunk,
+            set_text_chunk,
+        )
+
+        png_data = (golden_files_dir / "dual_chunk.png").read_bytes()
+        chunks = read_png_chunks(png_data)
+
+        injected = inject_text_chunk(png_data, "ccv3", '{"spec": "x"}')
+        assert injected == build_png(set_text_chunk(chunks, "ccv3", '{"spec": "x"}'))
+
+        removed = remove_text_chunk(injected, "chara")
+        text = read_text_chunks(removed)
+        assert "chara" not in text
+        assert text["ccv3"] == '{"spec": "x"}'
+
+    def test_plain_text_chunk_not_base64_decoded(self):
+        """普通文本 tEXt (含空格等非 Base64 字符) 直接按原文返回"""
+        from app.core.png_chunks import _decode_text_chunk
+
+        assert _decode_text_chunk(b"Software\x00Created with GIMP") == ("Software", "Created with GIMP")
+        assert _decode_text_chunk(b"chara\x00eyJhIjogMX0=") == ("chara", '{"a": 1}')
+
+    def test_keyword_filter_skips_other_chunks(self, golden_files_dir: Path):
+        """指定 keywords 时只解码匹配的 chunk；存在 ccv3 时不解码 chara"""
+        from unittest.mock import patch
+
+        from app.core import png_chunks
+
+        png_data = (golden_files_dir / "dual_chunk.png").read_bytes()
+        png_data = png_chunks.inject_text_chunk(png_data, "Comment", "not a card")
+
+        assert set(png_chunks.read_text_chunks(png_data, keywords={"chara"})) == {"chara"}
+
+        with patch.object(
+            png_chunks, "_decode_any_text_chunk", wraps=png_chunks._decode_any_text_chunk
+        ) as mock_decode:
+            fmt, _ = png_chunks.get_card_data_from_chunks(png_chunks.read_png_chunks(png_data))
+
+        assert fmt == "ccv3"
+        assert mock_decode.call_count == 1
+
+    def test_fast_path_matches_full_parse(self, golden_files_dir: Path):
+        """字节搜索快速路径与完整遍历结果一致；不可信时回退"""
+        from app.core import png_chunks
+
+        png_data = (golden_files_dir / "dual_chunk.png").read_bytes()
+        expected = png_chunks.get_card_data_from_chunks(png_chunks.read_png_chunks(png_data))
+        assert png_chunks._fast_find_text_chunk(png_data, "ccv3") is not None
+        assert png_chunks.get_card_data(png_data) == expected
+
+        # 之后还有同关键字的 iTXt chunk：快速路径放弃，完整遍历取最后一个
+        png_data = (golden_files_dir / "dual_chunk.png").read_bytes()
+        chunks = png_chunks.read_png_chunks(png_data)
+        itxt = b"ccv3\x00\x00\x00\x00\x00" + b'{"later": true}'
+        chunks.insert(len(chunks) - 1, ("iTXt", itxt))
+        png_data = png_chunks.build_png(chunks)
+        assert png_chunks._fast_find_text_chunk(png_data, "ccv3") is None
+        assert png_chunks.get_card_data(png_data) == ("ccv3", '{"later": true}')
+
+        # CRC 损坏：快速路径不信任该命中
+        png_data = bytearray((golden_files_dir / "dual_chunk.png").read_bytes())
+        idx = png_data.rfind(b"tEXtccv3\x00")
+        png_data[idx + 10] ^= 0xFF
+        assert png_chunks._fast_find_text_chunk(bytes(png_data), "ccv3") is None
+
+    def test_inject_replace_matches_keyword_without_decoding(self, golden_files_dir: Path):
+        """替换/删除时只比较关键字，不解码旧的 Base64 内容"""
+        from unittest.mock import patch
+
+        from app.core import png_chunks
+
+        png_data = (golden_files_dir / "dual_chunk.png").read_bytes()
+
+        with patch.object(png_chunks, "_decode_text_chunk") as mock_decode:
+            replaced = png_chunks.inject_text_chunk(png_data, "ccv3", "new")
+            removed = png_chunks.remove_text_chunk(replaced, "chara")
+        mock_decode.assert_not_called()
+
+        assert png_chunks.read_text_chunks(removed) == {"ccv3": "new"}
+        assert all(isinstance(t, str) for t, _ in png_chunks.read_png_chunks(removed))
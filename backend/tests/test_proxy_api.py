@@ -4,6 +4,7 @@ Proxy API 测试
 测试 AI 代理 API 端点。
 """
 
+import asyncio
 import json
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
@@ -15,6 +16,18 @@ from app.main import app
 client = TestClient(app)
 
 
+@pytest.fixture(autouse=True)
+def clear_client_cache():
+    """每个测试前清空 AI 客户端缓存，避免复用其他测试的 mock"""
+    from app.api.proxy import _client_cache, _client_leases, _evicted_clients
+
+    _client_cache.clear()
+    yield
+    _client_cache.clear()
+    _client_leases.clear()
+    _evicted_clients.clear()
+
+
 class TestProxyChat:
     """聊天代理 API 测试"""
     
@@ -274,3 +287,143 @@ class TestSSEStream:
         
         assert response.status_code == 200
         assert response.headers["content-type"].startswith("text/event-stream")
+    
+    async def test_stream_frames(self):
+        """SSE 数据帧与结束标记格式正确"""
+        from app.api.proxy import _generate_chat_stream
+        
+        mock_client = MagicMock()
+        
+        async def mock_stream(request):
+            yield MagicMock(
+                id="test",
+                object="chat.completion.chunk",
+                created=0,
+                model="gpt-4",
+                choices=[MagicMock(
+                    index=0,
+                    delta={"content": "你好"},
+                    finish_reason="stop",
+                )],
+            )
+        
+        mock_client.chat_stream = mock_stream
+        
+        frames = [frame async for frame in _generate_chat_stream(mock_client, MagicMock())]
+        
+        assert frames[-1] == b"data: [DONE]\n\n"
+        assert frames[0].startswith(b"data: ")
+        payload = json.loads(frames[0][len(b"data: "):])
+        assert payload["choices"][0]["delta"] == {"content": "你好"}
+        assert payload["choices"][0]["finish_reason"] == "stop"
+    
+    async def test_stream_error_frames(self):
+        """AI 客户端错误与未知异常均输出 error 事件帧"""
+        from app.api.proxy import _generate_chat_stream
+        from app.core.ai_client import RateLimitedError
+        
+        for exc, code in ((RateLimitedError(), "RATE_LIMITED"), (ValueError("boom"), "INTERNAL_ERROR")):
+            mock_client = MagicMock()
+            
+            async def mock_stream(request, exc=exc):
+                raise exc
+                yield
+            
+            mock_client.chat_stream = mock_stream
+            
+            frames = [frame async for frame in _generate_chat_stream(mock_client, MagicMock())]
+            
+            assert len(frames) == 1
+            assert frames[0].startswith(b"event: error\ndata: ")
+            assert json.loads(frames[0].split(b"data: ", 1)[1])["code"] == code
+
+
+class TestClientCache:
+    """AI 客户端复用测试"""
+    
+    def test_same_credentials_reuse_client(self):
+        """相同 base_url + api_key 复用同一客户端"""
+        from app.api.proxy import _client_cache, _get_client
+        
+        with patch("app.core.ai_client.validate_url_security"):
+            first = _get_client("https://api.openai.com", "sk-test")
+            second = _get_client("https://api.openai.com", "sk-test")
+            other = _get_client("https://api.openai.com", "sk-other")
+        
+        assert first is second
+        assert other is not first
+        assert all("sk-test" not in str(key) for key in _client_cache)
+    
+    def test_blocked_url_not_cached(self):
+        """安全校验失败不缓存"""
+        from app.api.proxy import _client_cache, _get_client
+        from app.core.security import URLBlockedError
+        
+        with pytest.raises(URLBlockedError):
+            _get_client("https://evil.com", "sk-test")
+        
+        assert len(_client_cache) == 0
+    
+    def test_cached_client_revalidated(self):
+        """命中缓存时仍重新执行 URL 安全校验"""
+        from app.api.proxy import _client_cache, _get_client
+        from app.core.security import PrivateIPError
+        
+        with patch("app.core.ai_client.validate_url_security"):
+            _get_client("https://api.openai.com", "sk-test")
+        
+        with patch(
+            "app.api.proxy.validate_url_security",
+            side_effect=PrivateIPError("10.0.0.1"),
+        ):
+            with pytest.raises(PrivateIPError):
+                _get_client("https://api.openai.com", "sk-test")
+    
+    @pytest.mark.asyncio
+    async def test_evicted_client_closed_after_release(self):
+        """被淘汰的客户端：空闲时后台关闭，使用中则等最后一个租用归还后关闭"""
+        from app.api import proxy
+        
+        with patch("app.api.proxy.AIClient") as mock_client_class, \
+                patch.object(proxy, "_CLIENT_CACHE_MAXSIZE", 1):
+            mock_client_class.side_effect = lambda **kwargs: MagicMock(aclose=AsyncMock())
+            
+            busy = proxy._acquire_client("https://api.openai.com", "sk-busy")
+            proxy._get_client("https://api.openai.com", "sk-idle")
+            idle = proxy._client_cache[next(iter(proxy._client_cache))]
+            
+            # busy 被淘汰但仍在使用：不关闭
+            busy.aclose.assert_not_awaited()
+            await proxy._release_client(busy)
+            busy.aclose.assert_awaited_once()
+            
+            # idle 被淘汰时无人使用：后台任务关闭，且任务被持有
+            proxy._get_client("https://api.openai.com", "sk-new")
+            assert len(proxy._close_tasks) == 1
+            await asyncio.gather(*proxy._close_tasks)
+            idle.aclose.assert_awaited_once()
+    
+    @pytest.mark.asyncio
+    async def test_stream_response_releases_lease(self):
+        """流式响应结束后归还租用，即使生成器从未被迭代（客户端提前断开）"""
+        from app.api import proxy
+        
+        with patch("app.api.proxy.AIClient") as mock_client_class:
+            mock_client_class.side_effect = lambda **kwargs: MagicMock(aclose=AsyncMock())
+            leased = proxy._acquire_client("https://api.openai.com", "sk-test")
+        
+        async def never_iterated():
+            raise AssertionError("body should not be sent")
+            yield b""
+        
+        async def receive():
+            return {"type": "http.disconnect"}
+        
+        async def send(message):
+            raise OSError("client disconnected")
+        
+        response = proxy._LeasedStreamingResponse(leased, never_iterated())
+        with pytest.raises(Exception):
+            await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+        
+        assert leased not in proxy._client_leases
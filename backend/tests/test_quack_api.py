@@ -14,6 +14,7 @@ from unittest.mock import AsyncMock, patch
 import pytest
 from fastapi.testclient import TestClient
 
+from app.api.quack import _parse_json_input, _parsed_input_cache, _try_parse_json
 from app.main import app
 
 
@@ -125,6 +126,26 @@ class TestQuackImportJsonMode:
         assert len(data["data"]["lorebook"]["entries"]) == 1
         assert data["data"]["card"] is None
 
+    def test_import_json_multiple_books_flattened(self, sample_quack_data):
+        """Entries from every book are collected; malformed books are skipped."""
+        entry = sample_quack_data["characterbooks"][0]["entryList"][0]
+        sample_quack_data["characterbooks"] = [
+            {"entryList": [entry, entry]},
+            "not a book",
+            {"entryList": None},
+            {"entryList": [entry]},
+        ]
+        response = client.post(
+            "/api/quack/import",
+            json={
+                "quack_input": json.dumps(sample_quack_data),
+                "mode": "only_lorebook",
+            },
+        )
+        
+        assert response.status_code == 200
+        assert len(response.json()["data"]["lorebook"]["entries"]) == 3
+
     def test_import_json_png_output(self, sample_quack_data):
         """Test importing card with PNG output format."""
         response = client.post(
@@ -145,6 +166,23 @@ class TestQuackImportJsonMode:
         png_bytes = base64.b64decode(data["data"]["png_base64"])
         assert png_bytes[:8] == b"\x89PNG\r\n\x1a\n"
 
+    def test_import_json_png_binary_when_accepted(self, sample_quack_data):
+        """Accept: image/png returns raw PNG bytes instead of Base64 JSON."""
+        response = client.post(
+            "/api/quack/import",
+            json={
+                "quack_input": json.dumps(sample_quack_data),
+                "mode": "full",
+                "output_format": "png",
+            },
+            headers={"Accept": "image/png"},
+        )
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/png"
+        assert response.content[:8] == b"\x89PNG\r\n\x1a\n"
+        assert ".png" in response.headers["content-disposition"]
+
     def test_import_json_no_lorebook_only_lorebook_mode(self, sample_quack_data_no_lorebook):
         """Test error when requesting only_lorebook but no lorebook exists."""
         response = client.post(
@@ -238,6 +276,50 @@ class TestQuackImportInvalidInput:
         assert response.status_code == 400
 
 
+class TestTryParseJson:
+    """Tests for the pasted-JSON detection helper."""
+
+    @pytest.mark.parametrize("value", ["12345", "https://quack.ai/chat/12345", "", "   "])
+    def test_ids_and_urls_skip_decoder(self, value):
+        """Inputs not starting with '{' never reach the JSON decoder."""
+        with patch("app.api.quack.orjson.loads") as mock_loads:
+            assert _try_parse_json(value) is None
+        mock_loads.assert_not_called()
+
+    def test_object_with_surrounding_whitespace(self):
+        """Leading/trailing whitespace around an object is accepted."""
+        assert _try_parse_json('\n  {"name": "A"}\u3000') == {"name": "A"}
+
+    def test_array_rejected(self):
+        """Top-level arrays are not treated as pasted character data."""
+        assert _try_parse_json("[1, 2]") is None
+
+    def test_preview_then_import_parses_once(self, sample_quack_data):
+        """Preview followed by import of the same JSON reuses the parse."""
+        quack_input = json.dumps(sample_quack_data)
+        _parsed_input_cache.clear()
+        
+        with patch("app.api.quack._try_parse_json", wraps=_try_parse_json) as mock_parse:
+            preview = client.post("/api/quack/preview", json={"quack_input": quack_input})
+            imported = client.post("/api/quack/import", json={"quack_input": quack_input})
+        
+        assert preview.status_code == 200
+        assert imported.status_code == 200
+        assert mock_parse.call_count == 1
+
+    def test_cached_parse_isolated_from_mutation(self):
+        """Mutating a returned object does not change later cache hits."""
+        quack_input = '{"name": "A", "charList": [{"name": "B"}]}'
+        _parsed_input_cache.clear()
+
+        first = _parse_json_input(quack_input)
+        first["name"] = "Mutated"
+        first["charList"][0]["name"] = "Mutated"
+        second = _parse_json_input(quack_input)
+
+        assert second == {"name": "A", "charList": [{"name": "B"}]}
+
+
 # ============================================================
 # Preview Endpoint Tests
 # ============================================================
@@ -264,6 +346,25 @@ class TestQuackPreview:
         assert data["data"]["lorebook_count"] == 1
         assert data["data"]["source"] == "json"
 
+    def test_preview_tags_from_image_tags_limited(self):
+        """Image tags fall back to value, skip empties and cap at 10."""
+        all_tags = [{"label": ""}, {"value": "v"}, "raw"] + [
+            {"label": f"t{i}"} for i in range(20)
+        ]
+        response = client.post(
+            "/api/quack/preview",
+            json={
+                "quack_input": json.dumps(
+                    {"charList": [{"name": "T", "generateImage": {"allTags": all_tags}}]}
+                ),
+            },
+        )
+
+        assert response.status_code == 200
+        tags = response.json()["data"]["tags"]
+        assert tags[0] == "v"
+        assert len(tags) == 10
+
     def test_preview_invalid_input(self):
         """Test error for invalid input in preview."""
         response = client.post(
@@ -275,6 +376,37 @@ class TestQuackPreview:
         
         assert response.status_code == 400
 
+    @patch("app.api.quack.QuackClient")
+    def test_preview_api_lorebook_failure_ignored(self, mock_client_class, sample_quack_data):
+        """Lorebook errors in API mode keep the count taken from the info payload."""
+        from app.core.exceptions import NetworkError
+        
+        mock_client = AsyncMock()
+        mock_client.fetch_character_info.return_value = sample_quack_data
+        mock_client.fetch_lorebook.side_effect = NetworkError("boom")
+        mock_client_class.return_value = mock_client
+        
+        response = client.post("/api/quack/preview", json={"quack_input": "12345"})
+        
+        assert response.status_code == 200
+        expected = len(sample_quack_data["characterbooks"][0]["entryList"])
+        assert response.json()["data"]["lorebook_count"] == expected
+        mock_client.fetch_lorebook.assert_awaited_once_with("12345")
+
+    @patch("app.api.quack.QuackClient")
+    def test_preview_api_info_error_mapped(self, mock_client_class):
+        """Character info errors still map to HTTP status codes."""
+        from app.core.exceptions import UnauthorizedError
+        
+        mock_client = AsyncMock()
+        mock_client.fetch_character_info.side_effect = UnauthorizedError("Cookie Invalid")
+        mock_client.fetch_lorebook.return_value = []
+        mock_client_class.return_value = mock_client
+        
+        response = client.post("/api/quack/preview", json={"quack_input": "12345"})
+        
+        assert response.status_code == 401
+
 
 # ============================================================
 # API Mode Tests (Mocked)
@@ -477,3 +609,18 @@ class TestQuackHardConstraints:
         
         # Entry without secondary_keys should have selective=False
         assert entries[1]["selective"] is False
+
+
+class TestQuackResponseSerialization:
+    """Responses use FastAPI's Pydantic dump_json fast path."""
+
+    @pytest.mark.parametrize("path", ["/quack/import", "/quack/preview"])
+    def test_route_keeps_default_response_class(self, path):
+        """A response_model with the default response class serializes via pydantic-core."""
+        from fastapi.datastructures import DefaultPlaceholder
+
+        from app.api.quack import router
+
+        route = next(r for r in router.routes if r.path == path)
+        assert route.response_model is not None
+        assert isinstance(route.response_class, DefaultPlaceholder)
@@ -4,6 +4,7 @@ Tests for Quack Client Module.
 Tests Cookie parsing, ID extraction, and error classification.
 """
 
+import asyncio
 import json
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
@@ -12,8 +13,10 @@ import httpx
 from app.core.quack_client import (
     CookieParser,
     QuackClient,
+    clear_response_cache,
     extract_quack_id,
     DEFAULT_USER_AGENT,
+    _HTTP2,
 )
 from app.core.exceptions import (
     NetworkError,
@@ -23,6 +26,14 @@ from app.core.exceptions import (
 )
 
 
+@pytest.fixture(autouse=True)
+def clear_quack_cache():
+    """Isolate tests from the module-level response cache."""
+    clear_response_cache()
+    yield
+    clear_response_cache()
+
+
 class TestCookieParser:
     """Tests for CookieParser class."""
 
@@ -49,6 +60,12 @@ class TestCookieParser:
         result = CookieParser.parse(cookie_str)
         assert result == {"auth": "base64==token", "simple": "value"}
 
+    def test_parse_header_string_edge_cases(self):
+        """Empty segments, bare names and empty names are skipped; the last duplicate wins."""
+        cookie_str = "COOKIE: a = 1 ;; flag ; =orphan; a=2; b="
+        result = CookieParser.parse(cookie_str)
+        assert result == {"a": "2", "b": ""}
+
     def test_parse_json_format(self):
         """Parse JSON format (EditThisCookie export)."""
         cookies = [
@@ -77,6 +94,12 @@ class TestCookieParser:
         result = CookieParser.parse("[invalid json")
         assert result == {}
 
+    def test_parse_json_oversized_rejected(self):
+        """Oversized JSON cookie input is not parsed."""
+        padding = "x" * 1_000_000
+        cookie_str = json.dumps([{"name": "session", "value": "abc", "pad": padding}])
+        assert CookieParser.parse(cookie_str) == {}
+
     def test_parse_netscape_format(self):
         """Parse Netscape cookies.txt format."""
         netscape = """# Netscape HTTP Cookie File
@@ -85,6 +108,23 @@ class TestCookieParser:
         result = CookieParser.parse(netscape)
         assert result == {"session": "abc123", "token": "xyz789"}
 
+    def test_parse_netscape_crlf_and_extra_columns(self):
+        """CRLF line endings are handled; columns after the value are ignored."""
+        cookie_str = (
+            "# Netscape HTTP Cookie File\r\n"
+            "\r\n"
+            ".quack.ai\tTRUE\t/\tFALSE\t0\tsession\tabc123\r\n"
+            ".quack.ai\tTRUE\t/\tFALSE\t0\ttoken\txyz\textra\r\n"
+        )
+        result = CookieParser.parse(cookie_str)
+        assert result == {"session": "abc123", "token": "xyz"}
+
+    def test_parse_netscape_without_header_comment(self):
+        """Files starting directly with a dotted domain line are Netscape format."""
+        netscape = ".quack.ai\tTRUE\t/\tFALSE\t0\tsession\tabc123"
+        assert CookieParser.parse(netscape) == {"session": "abc123"}
+        assert CookieParser.parse("  [ ]  ") == {}
+
     def test_parse_netscape_with_comment_only(self):
         """Netscape format with only comments."""
         netscape = "# Just a comment\n# Another comment"
@@ -138,6 +178,24 @@ class TestExtractQuackId:
         """Strip whitespace from input."""
         assert extract_quack_id("  1234567  ") == "1234567"
 
+    def test_extract_rejects_embedded_newline(self):
+        """The ID pattern must match the whole string, not stop at a newline."""
+        assert extract_quack_id("123\n456") is None
+        assert extract_quack_id("HTTPS://QUACK.AI/character/42") == "42"
+
+    def test_direct_id_skips_url_parsing(self):
+        """Plain IDs, even ones containing 'quack', never reach urlparse."""
+        with patch("app.core.quack_client.urlparse") as mock_urlparse:
+            assert extract_quack_id("quackfan_01") == "quackfan_01"
+            assert extract_quack_id("character") == "character"
+        mock_urlparse.assert_not_called()
+
+    def test_numeric_fast_path_is_ascii_only(self):
+        """Unicode digits are not accepted as a numeric ID."""
+        assert extract_quack_id("0042") == "0042"
+        assert extract_quack_id("12\u00b2") is None
+        assert extract_quack_id("\u0661\u0662\u0663") is None
+
 
 class TestQuackClientHeaders:
     """Tests for QuackClient header building."""
@@ -156,12 +214,44 @@ class TestQuackClientHeaders:
         headers = client._get_headers()
         assert headers["Cookie"] == "session=abc123"
 
+    def test_default_headers_shared(self):
+        """Cookie-less default clients share one headers dict; others get their own."""
+        first, second = QuackClient(), QuackClient()
+        assert first._get_headers() is second._get_headers()
+        
+        with_cookie = QuackClient(cookies={"session": "abc123"})
+        assert with_cookie._get_headers() is not first._get_headers()
+        assert "Cookie" not in first._get_headers()
+
     def test_custom_user_agent(self):
         """Custom User-Agent."""
         client = QuackClient(user_agent="CustomAgent/1.0")
         headers = client._get_headers()
         assert headers["User-Agent"] == "CustomAgent/1.0"
 
+    @pytest.mark.asyncio
+    async def test_headers_built_once_and_sent(self):
+        """Headers are prebuilt; set_cookies rebuilds them and the cache key."""
+        sent = []
+        
+        def handler(request):
+            sent.append(request.headers.get("cookie"))
+            return httpx.Response(200, json={"code": 0, "name": "C"})
+        
+        real_client = httpx.AsyncClient
+        transport = httpx.MockTransport(handler)
+        with patch("httpx.AsyncClient", lambda **kw: real_client(transport=transport, **kw)):
+            async with QuackClient(cookies={"session": "a"}) as client:
+                assert client._get_headers() is client._get_headers()
+                key_a = client._cache_key("info", "1")
+                await client.fetch_character_info("1")
+                
+                client.set_cookies({"session": "b"})
+                assert client._cache_key("info", "1") != key_a
+                await client.fetch_character_info("1")
+        
+        assert sent == ["session=a", "session=b"]
+
 
 class TestQuackClientErrorClassification:
     """Tests for QuackClient error classification."""
@@ -194,6 +284,15 @@ class TestQuackClientErrorClassification:
             client._classify_error(500, "Internal Server Error")
         assert "500" in str(exc_info.value)
 
+    def test_error_body_bytes_truncated(self):
+        """Raw body bytes are decoded only up to 500 bytes for the error details."""
+        client = QuackClient()
+        with pytest.raises(NetworkError) as exc_info:
+            client._classify_error(404, "未找到".encode() + b"x" * 1000)
+        body = exc_info.value.details["body"]
+        assert body.startswith("未找到")
+        assert len(body.encode()) == 500
+
 
 class TestQuackClientAsync:
     """Async tests for QuackClient."""
@@ -203,11 +302,11 @@ class TestQuackClientAsync:
         """Successful character info fetch."""
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {
+        mock_response.content = json.dumps({
             "code": 0,
             "name": "TestChar",
             "charList": [{"name": "TestChar"}],
-        }
+        }).encode()
         
         with patch("httpx.AsyncClient") as mock_client_class:
             mock_client = AsyncMock()
@@ -259,7 +358,7 @@ class TestQuackClientAsync:
         """Successful lorebook fetch."""
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {
+        mock_response.content = json.dumps({
             "code": 0,
             "data": [
                 {
@@ -270,7 +369,7 @@ class TestQuackClientAsync:
                     ],
                 }
             ],
-        }
+        }).encode()
         
         with patch("httpx.AsyncClient") as mock_client_class:
             mock_client = AsyncMock()
@@ -285,20 +384,60 @@ class TestQuackClientAsync:
             assert len(result) == 1
             assert result[0]["name"] == "Entry 1"
 
+    @pytest.mark.asyncio
+    async def test_invalid_json_body_raises_network_error(self):
+        """A 200 response with a non-JSON body maps to NetworkError."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.content = b"<html>maintenance</html>"
+        
+        with patch("httpx.AsyncClient") as mock_client_class:
+            mock_client = AsyncMock()
+            mock_client.get = AsyncMock(return_value=mock_response)
+            mock_client_class.return_value = mock_client
+            
+            with pytest.raises(NetworkError, match="invalid JSON"):
+                await QuackClient().fetch_character_info("1234567")
+
+    @pytest.mark.asyncio
+    async def test_fetch_lorebook_flattens_in_order(self):
+        """Books and bare entries flatten in response order; non-dicts are skipped."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.content = json.dumps({
+            "code": 0,
+            "data": [
+                {"entryList": [{"name": "A1"}, {"name": "A2"}]},
+                {"name": "Bare"},
+                "junk",
+                {"entryList": None},
+                {"entryList": [{"name": "B1"}]},
+            ],
+        }).encode()
+        
+        with patch("httpx.AsyncClient") as mock_client_class:
+            mock_client = AsyncMock()
+            mock_client.get = AsyncMock(return_value=mock_response)
+            mock_client_class.return_value = mock_client
+            
+            result = await QuackClient().fetch_lorebook("1234567")
+        
+        assert [e["name"] for e in result] == ["A1", "A2", "Bare", "B1"]
+
     @pytest.mark.asyncio
     async def test_fetch_character_complete(self):
         """Fetch complete character data (info + lorebook)."""
         info_response = MagicMock()
         info_response.status_code = 200
-        info_response.json.return_value = {
+        info_response.content = json.dumps({
             "code": 0,
             "name": "TestChar",
             "charList": [{"name": "TestChar"}],
-        }
+        }).encode()
         
         lorebook_response = MagicMock()
         lorebook_response.status_code = 200
-        lorebook_response.json.return_value = {"code": 0, "data": []}
+        lorebook_response.content = json.dumps({"code": 0, "data": []}).encode()
         
         with patch("httpx.AsyncClient") as mock_client_class:
             mock_client = AsyncMock()
@@ -313,6 +452,215 @@ class TestQuackClientAsync:
             assert info["name"] == "TestChar"
             assert lorebook == []
 
+    @pytest.mark.asyncio
+    async def test_fetch_character_complete_runs_concurrently(self):
+        """Info and lorebook requests are in flight at the same time."""
+        in_flight = 0
+        peak = 0
+        
+        async def fake_get(url, **kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            response = MagicMock()
+            response.status_code = 200
+            response.content = json.dumps(
+                {"code": 0, "data": [{"name": "E"}]} if "book" in url else {"code": 0, "name": "C"}
+            ).encode()
+            return response
+        
+        with patch("httpx.AsyncClient") as mock_client_class:
+            mock_client = AsyncMock()
+            mock_client.get = fake_get
+            mock_client_class.return_value = mock_client
+            
+            info, lorebook = await QuackClient().fetch_character_complete("1234567")
+        
+        assert peak == 2
+        assert info["name"] == "C"
+        assert lorebook == [{"name": "E"}]
+
+    @pytest.mark.asyncio
+    async def test_fetch_character_complete_error_semantics(self):
+        """A lorebook failure degrades to []; an info failure is raised."""
+        ok = MagicMock()
+        ok.status_code = 200
+        ok.content = json.dumps({"code": 0, "name": "C"}).encode()
+        
+        async def lorebook_fails(url, **kwargs):
+            if "book" in url:
+                raise httpx.ConnectError("down")
+            return ok
+        
+        async def info_fails(url, **kwargs):
+            if "book" in url:
+                return ok
+            raise httpx.ReadTimeout("slow")
+        
+        with patch("httpx.AsyncClient") as mock_client_class:
+            mock_client = AsyncMock()
+            mock_client_class.return_value = mock_client
+            
+            mock_client.get = lorebook_fails
+            info, lorebook = await QuackClient().fetch_character_complete("1")
+            assert info["name"] == "C"
+            assert lorebook == []
+            
+            mock_client.get = info_fails
+            with pytest.raises(TimeoutError):
+                await QuackClient().fetch_character_complete("2")
+
+    @pytest.mark.asyncio
+    async def test_fetches_share_one_http_client(self):
+        """Info and lorebook fetches reuse one pooled client until aclose()."""
+        info_response = MagicMock()
+        info_response.status_code = 200
+        info_response.content = json.dumps({"code": 0, "name": "TestChar"}).encode()
+        
+        lorebook_response = MagicMock()
+        lorebook_response.status_code = 200
+        lorebook_response.content = json.dumps({"code": 0, "data": []}).encode()
+        
+        with patch("httpx.AsyncClient") as mock_client_class:
+            mock_client = AsyncMock()
+            mock_client.get = AsyncMock(side_effect=[info_response, lorebook_response])
+            mock_client_class.return_value = mock_client
+            
+            client = QuackClient()
+            await client.fetch_character_complete("1234567")
+            await client.aclose()
+            
+            assert mock_client_class.call_count == 1
+            mock_client.aclose.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_async_context_manager_closes_client(self):
+        """async with QuackClient() closes the pooled client on exit."""
+        with patch("httpx.AsyncClient") as mock_client_class:
+            mock_client = AsyncMock()
+            mock_client_class.return_value = mock_client
+            
+            async with QuackClient() as client:
+                assert client._get_http_client() is client._get_http_client()
+            
+            assert mock_client_class.call_count == 1
+            assert mock_client_class.call_args.kwargs["limits"].max_keepalive_connections == 20
+            # HTTP/2 only when the optional h2 package is installed
+            assert mock_client_class.call_args.kwargs["http2"] is _HTTP2
+            mock_client.aclose.assert_awaited_once()
+            assert client._http_client is None
+
+    def test_http_client_rebound_per_event_loop(self):
+        """Connections are loop-bound: another event loop gets its own client, the old one is closed."""
+        client = QuackClient()
+        
+        async def get_client():
+            http_client = client._get_http_client()
+            await asyncio.sleep(0)
+            return http_client
+        
+        with patch("httpx.AsyncClient", side_effect=lambda **kwargs: MagicMock(aclose=AsyncMock())):
+            first = asyncio.run(get_client())
+            second = asyncio.run(get_client())
+        
+        assert first is not second
+        first.aclose.assert_awaited_once()
+        second.aclose.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_fresh_response_served_from_cache(self):
+        """A second fetch within the TTL does not hit the network."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.headers = {"etag": '"v1"'}
+        mock_response.content = json.dumps({"code": 0, "name": "TestChar"}).encode()
+        
+        with patch("httpx.AsyncClient") as mock_client_class:
+            mock_client = AsyncMock()
+            mock_client.get = AsyncMock(return_value=mock_response)
+            mock_client_class.return_value = mock_client
+            
+            client = QuackClient(cookies={"session": "test"})
+            first = await client.fetch_character_info("1234567")
+            first["name"] = "Mutated"
+            second = await client.fetch_character_info("1234567")
+            
+            assert second["name"] == "TestChar"
+            mock_client.get.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_cache_hits_parse_independent_copies(self):
+        """Each cache hit re-parses the stored body, so nested edits do not leak."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.headers = {"etag": '"v1"'}
+        mock_response.content = json.dumps(
+            {"code": 0, "data": [{"name": "Entry 1", "keys": ["a"]}]}
+        ).encode()
+        
+        with patch("httpx.AsyncClient") as mock_client_class:
+            mock_client = AsyncMock()
+            mock_client.get = AsyncMock(return_value=mock_response)
+            mock_client_class.return_value = mock_client
+            
+            client = QuackClient()
+            first = await client.fetch_lorebook("1234567")
+            first[0]["keys"].append("b")
+            second = await client.fetch_lorebook("1234567")
+            
+            assert second == [{"name": "Entry 1", "keys": ["a"]}]
+            mock_client.get.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_stale_response_revalidated_with_etag(self):
+        """A stale entry sends If-None-Match and reuses the payload on 304."""
+        ok_response = MagicMock()
+        ok_response.status_code = 200
+        ok_response.headers = {"etag": '"v1"'}
+        ok_response.content = json.dumps({"code": 0, "data": [{"name": "Entry 1"}]}).encode()
+        
+        not_modified = MagicMock()
+        not_modified.status_code = 304
+        
+        with patch("httpx.AsyncClient") as mock_client_class, \
+                patch("app.core.quack_client.get_settings") as mock_settings:
+            mock_settings.return_value.quack_cache_ttl_seconds = 0
+            mock_client = AsyncMock()
+            mock_client.get = AsyncMock(side_effect=[ok_response, not_modified])
+            mock_client_class.return_value = mock_client
+            
+            client = QuackClient()
+            await client.fetch_lorebook("1234567")
+            result = await client.fetch_lorebook("1234567")
+            
+            assert result == [{"name": "Entry 1"}]
+            headers = mock_client.get.call_args_list[1].kwargs["headers"]
+            assert headers["If-None-Match"] == '"v1"'
+
+    @pytest.mark.asyncio
+    async def test_endpoint_urls_resolved_at_construction(self):
+        """Fetches use URLs built in __init__ without re-reading settings."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.headers = {}
+        mock_response.content = json.dumps({"code": 0, "name": "TestChar"}).encode()
+        
+        with patch("httpx.AsyncClient") as mock_client_class:
+            mock_client = AsyncMock()
+            mock_client.get = AsyncMock(return_value=mock_response)
+            mock_client_class.return_value = mock_client
+            
+            client = QuackClient()
+            with patch("app.core.quack_client.get_settings") as mock_settings:
+                await client.fetch_character_info("1234567")
+            mock_settings.assert_not_called()
+            
+            url = mock_client.get.call_args.args[0]
+            assert url == "https://api.quack.ai/character/info"
+            assert mock_client.get.call_args.kwargs["params"] == {"id": "1234567"}
+
 
 class TestCookieParserEdgeCases:
     """Edge case tests for CookieParser."""
@@ -108,6 +108,22 @@ class TestExtractPersonality:
         result = extract_personality(attrs)
         assert result == ""
 
+    def test_single_pass_scan_matches_helpers(self):
+        """_scan_attrs returns the same results as format_attrs + extract_personality."""
+        from app.core.quack_mapper import _scan_attrs
+
+        attrs = [
+            {"label": "Personality", "value": "Shy", "isVisible": False},
+            {"label": "Age", "value": "20"},
+            {"label": "personality", "value": "Loud"},
+            {"label": "Empty", "value": ""},
+            {"label": "Hidden", "value": "x", "isVisible": False},
+        ]
+
+        assert _scan_attrs(attrs) == (format_attrs(attrs), extract_personality(attrs))
+        assert _scan_attrs(attrs)[1] == "Shy"
+        assert _scan_attrs([]) == ("", "")
+
 
 class TestExtractGreetings:
     """Tests for extract_greetings function."""
@@ -150,6 +166,17 @@ class TestExtractGreetings:
         first_mes, _ = extract_greetings(quack_info)
         assert first_mes == html_greeting
 
+    def test_extract_greetings_null_and_malformed_fields(self):
+        """Null prologue, null greetings and non-list alternates fall through."""
+        assert extract_greetings({"firstMes": "Hi", "prologue": None}) == ("Hi", [])
+        assert extract_greetings({"firstMes": "Hi", "prologue": {"greetings": None}}) == ("Hi", [])
+        quack_info = {
+            "firstMes": "",
+            "alternate_greetings": "not a list",
+            "prologue": {"greetings": [{"value": "A"}, "B", 3]},
+        }
+        assert extract_greetings(quack_info) == ("A", ["B"])
+
 
 class TestExtractTags:
     """Tests for extract_tags function."""
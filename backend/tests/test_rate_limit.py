@@ -12,6 +12,7 @@ from app.middleware.rate_limit import (
     RateLimiter,
     get_client_ip,
 )
+from app.settings import Settings
 
 
 class TestRateLimiter:
@@ -92,6 +93,45 @@ class TestRateLimiter:
         
         assert reset_time is not None
         assert 9 < reset_time <= 10
+    
+    def test_window_evicts_oldest_first(self):
+        """窗口外的时间戳从队首逐个淘汰，重置时间取最旧的有效请求"""
+        limiter = RateLimiter(requests=2, window_seconds=10)
+        
+        with patch("app.middleware.rate_limit.time.time") as mock_time:
+            mock_time.return_value = 100.0
+            assert limiter.is_allowed("test-ip") is True
+            mock_time.return_value = 105.0
+            assert limiter.is_allowed("test-ip") is True
+            assert limiter.is_allowed("test-ip") is False
+            
+            # 时间戳恰好位于窗口边界时已过期
+            mock_time.return_value = 110.0
+            assert limiter.get_remaining("test-ip") == 1
+            assert limiter.get_reset_time("test-ip") == 5.0
+            assert limiter.is_allowed("test-ip") is True
+            assert limiter.is_allowed("test-ip") is False
+    
+    def test_queries_do_not_create_keys(self):
+        """查询未知键不会新增记录"""
+        limiter = RateLimiter(requests=2, window_seconds=10)
+        
+        assert limiter.get_remaining("unknown") == 2
+        assert limiter.get_reset_time("unknown") is None
+        assert limiter.cleanup() == 0
+    
+    def test_tracked_keys_bounded(self):
+        """键数超过上限时淘汰最久未访问的键"""
+        limiter = RateLimiter(requests=1, window_seconds=60, max_keys=2)
+        
+        assert limiter.is_allowed("ip-1") is True
+        assert limiter.is_allowed("ip-2") is True
+        assert limiter.is_allowed("ip-1") is False  # ip-1 变为最近访问
+        assert limiter.is_allowed("ip-3") is True  # 淘汰 ip-2
+        
+        assert limiter.get_remaining("ip-1") == 0
+        assert limiter.get_remaining("ip-2") == 1
+        assert limiter.get_remaining("ip-3") == 0
 
 
 class TestGetClientIP:
@@ -104,8 +144,7 @@ class TestGetClientIP:
         request.client = MagicMock()
         request.client.host = "1.2.3.4"
         
-        mock_settings = MagicMock()
-        mock_settings.trusted_proxies = []
+        mock_settings = Settings(trusted_proxies=[])
         with patch("app.middleware.rate_limit.get_settings", return_value=mock_settings):
             assert get_client_ip(request) == "1.2.3.4"
     
@@ -116,8 +155,7 @@ class TestGetClientIP:
         request.client = MagicMock()
         request.client.host = "10.0.0.1"
         
-        mock_settings = MagicMock()
-        mock_settings.trusted_proxies = []
+        mock_settings = Settings(trusted_proxies=[])
         with patch("app.middleware.rate_limit.get_settings", return_value=mock_settings):
             assert get_client_ip(request) == "10.0.0.1"
     
@@ -128,8 +166,7 @@ class TestGetClientIP:
         request.client = MagicMock()
         request.client.host = "127.0.0.1"
         
-        mock_settings = MagicMock()
-        mock_settings.trusted_proxies = ["127.0.0.1"]
+        mock_settings = Settings(trusted_proxies=["127.0.0.1"])
         with patch("app.middleware.rate_limit.get_settings", return_value=mock_settings):
             assert get_client_ip(request) == "1.2.3.4"
     
@@ -140,8 +177,7 @@ class TestGetClientIP:
         request.client = MagicMock()
         request.client.host = "127.0.0.1"
         
-        mock_settings = MagicMock()
-        mock_settings.trusted_proxies = ["127.0.0.1"]
+        mock_settings = Settings(trusted_proxies=["127.0.0.1"])
         with patch("app.middleware.rate_limit.get_settings", return_value=mock_settings):
             assert get_client_ip(request) == "1.2.3.4"
     
@@ -151,7 +187,12 @@ class TestGetClientIP:
         request.headers = {}
         request.client = None
         
-        mock_settings = MagicMock()
-        mock_settings.trusted_proxies = []
+        mock_settings = Settings(trusted_proxies=[])
         with patch("app.middleware.rate_limit.get_settings", return_value=mock_settings):
             assert get_client_ip(request) == "unknown"
+    
+    def test_trusted_proxies_set_cached(self):
+        """可信代理集合在 Settings 上只构建一次"""
+        settings = Settings(trusted_proxies=["127.0.0.1", "10.0.0.1"])
+        assert settings.trusted_proxies_set == frozenset({"127.0.0.1", "10.0.0.1"})
+        assert settings.trusted_proxies_set is settings.trusted_proxies_set
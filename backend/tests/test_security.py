@@ -5,6 +5,7 @@ Security 模块测试
 """
 
 import pytest
+from unittest.mock import patch
 
 from app.core.security import (
     is_private_ip,
@@ -15,6 +16,7 @@ from app.core.security import (
     URLBlockedError,
     PrivateIPError,
 )
+from app.settings import Settings
 
 
 class TestIsPrivateIP:
@@ -69,6 +71,15 @@ class TestIsPrivateIP:
         """无效 IP 应被视为私网（安全优先）"""
         assert is_private_ip("not-an-ip") is True
         assert is_private_ip("") is True
+    
+    def test_repeat_checks_are_cached(self):
+        """重复校验同一 IP 直接命中缓存，结果不变"""
+        is_private_ip.cache_clear()
+        assert is_private_ip("169.254.169.254") is True
+        assert is_private_ip("169.254.169.254") is True
+        assert is_private_ip("8.8.8.8") is False
+        info = is_private_ip.cache_info()
+        assert (info.hits, info.misses) == (1, 2)
 
 
 class TestIsLocalhost:
@@ -124,6 +135,14 @@ class TestIsHostnameInAllowlist:
         allowlist = ["api.openai.com"]
         assert is_hostname_in_allowlist("evil.com", allowlist) is False
         assert is_hostname_in_allowlist("openai.com.evil.com", allowlist) is False
+    
+    def test_match_requires_label_boundary(self):
+        """父域名匹配只在 "." 边界处生效"""
+        allowlist = ["openai.com", "*.Anthropic.com"]
+        assert is_hostname_in_allowlist("notopenai.com", allowlist) is False
+        assert is_hostname_in_allowlist("evilanthropic.com", allowlist) is False
+        assert is_hostname_in_allowlist("a.b.anthropic.com", allowlist) is True
+        assert is_hostname_in_allowlist("com", allowlist) is False
 
 
 class TestValidateUrlSecurity:
@@ -159,6 +178,31 @@ class TestValidateUrlSecurity:
         """无效 URL 应被阻止"""
         with pytest.raises(URLBlockedError):
             validate_url_security("not-a-url")
+    
+    def test_blocked_host_skips_dns(self):
+        """白名单外的主机直接拒绝，不做 DNS 解析"""
+        with patch("app.core.security.resolve_hostname") as mock_resolve:
+            with pytest.raises(URLBlockedError):
+                validate_url_security("https://evil.com/api")
+        mock_resolve.assert_not_called()
+    
+    def test_allowed_host_resolving_to_private_ip(self):
+        """白名单内主机解析到私网地址时被阻止；主机名大小写不敏感"""
+        with patch("app.core.security.resolve_hostname", return_value=["10.0.0.5"]) as mock_resolve:
+            with pytest.raises(PrivateIPError):
+                validate_url_security("https://API.OpenAI.com/v1")
+        mock_resolve.assert_called_once_with("api.openai.com")
+    
+    def test_uses_configured_allowlist(self):
+        """白名单取自 Settings 的缓存元组"""
+        settings = Settings(proxy_url_allowlist=["example.org"])
+        assert settings.proxy_url_allowlist_tuple is settings.proxy_url_allowlist_tuple
+        
+        with patch("app.core.security.get_settings", return_value=settings), \
+                patch("app.core.security.resolve_hostname", return_value=[]):
+            validate_url_security("https://cdn.example.org/x")
+            with pytest.raises(URLBlockedError):
+                validate_url_security("https://api.openai.com/v1")
 
 
 class TestRedactSensitiveData:
@@ -190,3 +234,28 @@ class TestRedactSensitiveData:
         text = "Normal log message without secrets"
         result = redact_sensitive_data(text)
         assert result == text
+    
+    def test_bearer_token_inside_authorization_header(self):
+        """规则按顺序替换：Authorization 头中的 Bearer token 被脱敏"""
+        text = "Authorization: Bearer abc.def.ghi"
+        result = redact_sensitive_data(text)
+        assert "abc.def.ghi" not in result
+        assert result.startswith("Authorization: ")
+    
+    def test_non_ascii_text_still_scanned(self):
+        """非 ASCII 文本不走快速路径，大小写折叠变体仍被脱敏"""
+        text = "AUTHORıZATION: secret-value 你好"
+        result = redact_sensitive_data(text)
+        assert "secret-value" not in result
+        
+        clean = "普通日志，没有敏感信息"
+        assert redact_sensitive_data(clean) == clean
+    
+    @pytest.mark.parametrize("text,secret", [
+        ("AUTHORİZATION: secret-one", "secret-one"),
+        ("COO\u212aIE=secret-two; 日志", "secret-two"),
+        ("x-api-key: secret.three 中文", "secret.three"),
+    ])
+    def test_case_folded_markers_still_redacted(self, text, secret):
+        """IGNORECASE 能匹配的非 ASCII 字母（İ、开尔文符号 K）不会被标记检查漏掉"""
+        assert secret not in redact_sensitive_data(text)
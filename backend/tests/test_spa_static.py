@@ -0,0 +1,48 @@
+"""Tests for the SPA static file mount."""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.main import SPAStaticFiles
+
+
+@pytest.fixture
+def client(tmp_path):
+    """App with one API route and the SPA mounted on a temporary build dir."""
+    (tmp_path / "index.html").write_text("<html>spa</html>")
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "assets" / "app.js").write_text("console.log(1)")
+
+    app = FastAPI()
+
+    @app.get("/api/ping")
+    async def ping():
+        return {"ok": True}
+
+    app.mount("/", SPAStaticFiles(directory=tmp_path, html=True), name="spa")
+    return TestClient(app)
+
+
+def test_serves_existing_asset(client):
+    """Existing files are served as-is, with an ETag for revalidation."""
+    response = client.get("/assets/app.js")
+    assert response.status_code == 200
+    assert response.text == "console.log(1)"
+
+    etag = response.headers["etag"]
+    assert client.get("/assets/app.js", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_root_and_deep_links_serve_index(client):
+    """The root and unknown client-side routes fall back to index.html."""
+    for path in ("/", "/cards/edit/123"):
+        response = client.get(path)
+        assert response.status_code == 200
+        assert response.text == "<html>spa</html>"
+
+
+def test_api_routes_take_precedence(client):
+    """API routes win over the mount; unknown API paths stay 404."""
+    assert client.get("/api/ping").json() == {"ok": True}
+    assert client.get("/api/missing").status_code == 404
@@ -2,6 +2,7 @@
 
 import pytest
 
+from app.core import token_estimator
 from app.core.token_estimator import (
     estimate_tokens,
     estimate_card_tokens,
@@ -58,6 +59,40 @@ class TestEstimateTokens:
         expected = int(len(text) / 0.7)
         assert tokens == expected
 
+    def test_cjk_runs_counted_per_character(self):
+        """CJK runs of any length, split by Latin or other non-CJK text, count per character."""
+        text = "Hi 你好世界，é x 한 “quoted” カタカナ"
+        cjk_count = 4 + 1 + 1 + 4  # 你好世界 + ， + 한 + カタカナ
+        expected = int(cjk_count / 0.7 + (len(text) - cjk_count) / 4)
+        assert estimate_tokens(text) == expected
+
+    @pytest.mark.parametrize("first,last", [
+        (0x4E00, 0x9FFF),  # CJK Unified Ideographs
+        (0x3400, 0x4DBF),  # Extension A
+        (0xF900, 0xFAFF),  # Compatibility Ideographs
+        (0x3000, 0x30FF),  # Symbols/Punctuation, Hiragana, Katakana
+        (0xAC00, 0xD7AF),  # Hangul
+        (0xFF00, 0xFFEF),  # Fullwidth Forms
+    ])
+    def test_cjk_range_boundaries(self, first, last):
+        """Range endpoints count as CJK; the codepoints just outside do not."""
+        inside = chr(first) * 7 + chr(last) * 7
+        assert estimate_tokens(inside) == int(14 / 0.7)
+        outside = chr(first - 1) * 8 + chr(last + 1) * 8
+        assert estimate_tokens(outside) == 16 // 4
+
+    def test_repeat_strings_hit_cache_long_strings_bypass_it(self):
+        """Repeated strings come from the LRU; very long ones are not stored."""
+        token_estimator._estimate_tokens_cached.cache_clear()
+        text = "Unchanged description 说明"
+        assert estimate_tokens(text) == estimate_tokens(text)
+        info = token_estimator._estimate_tokens_cached.cache_info()
+        assert (info.hits, info.misses) == (1, 1)
+
+        long_text = "x" * (token_estimator._TOKEN_CACHE_MAX_TEXT_LEN + 1)
+        assert estimate_tokens(long_text) == len(long_text) // 4
+        assert token_estimator._estimate_tokens_cached.cache_info().currsize == 1
+
 
 class TestEstimateLorebookTokens:
     """Tests for lorebook token estimation."""
@@ -197,6 +232,28 @@ class TestEstimateCardTokens:
         assert "character_book" in result
         assert result["character_book"] > 0
 
+    def test_repeated_estimates_are_independent(self):
+        """Repeated estimates match and mutating a result does not affect later ones."""
+        card = CharacterCardV3(
+            data=CharacterCardData(name="Cache", description="same content")
+        )
+        first = estimate_card_tokens(card)
+        first["total"] = -1
+
+        second = estimate_card_tokens(card)
+        assert second["total"] > 0
+        assert second == estimate_card_tokens(card.model_copy(deep=True))
+
+    def test_changed_card_is_recomputed(self):
+        """A modified card does not reuse the previous breakdown."""
+        card = CharacterCardV3(data=CharacterCardData(name="Test", description="short"))
+        before = estimate_card_tokens(card)
+
+        card.data.description = "much longer description " * 20
+        after = estimate_card_tokens(card)
+
+        assert after["description"] > before["description"]
+
 
 class TestGetTokenWarningLevel:
     """Tests for token warning level detection."""
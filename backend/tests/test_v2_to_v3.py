@@ -68,6 +68,12 @@ class TestMigrateV2ToV3:
         assert result_dict["data"].get("custom_field") == "should be preserved"
         assert result_dict["data"].get("another_unknown") == 123
 
+    def test_missing_name_defaults_to_empty(self):
+        """A card without 'name' still migrates, with an empty name."""
+        result = migrate_v2_to_v3({"data": {"description": "No name here"}})
+        assert result.data.name == ""
+        assert result.data.description == "No name here"
+
 
 class TestMigrateLorebook:
     """Tests for lorebook migration."""
@@ -133,3 +139,25 @@ class TestMigrateLorebook:
         result_dict = result.model_dump(mode="json")
         assert result_dict.get("custom_book_field") == "also preserved"
         assert result_dict["entries"][0].get("custom_entry_field") == "preserved"
+
+    def test_preserves_extras_named_like_model_attributes(self):
+        """Extras named like model methods or private attrs are kept, in order."""
+        v2_book = {
+            "entries": [
+                {
+                    "keys": ["test"],
+                    "content": "Test",
+                    "copy": "kept",
+                    "_uid": 7,
+                    "model_dump": "kept too",
+                }
+            ],
+        }
+        result = migrate_lorebook(v2_book)
+
+        assert result is not None
+        entry = result.model_dump(mode="json")["entries"][0]
+        assert list(entry)[-3:] == ["copy", "_uid", "model_dump"]
+        assert entry["copy"] == "kept"
+        assert entry["_uid"] == 7
+        assert entry["model_dump"] == "kept too"